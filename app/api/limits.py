@@ -0,0 +1,64 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from app.config import MAX_UPLOAD_BYTES, BATCH_MAX_BYTES, BATCH_MAX_FILES
+from app.services.jobs import scheduler
+
+# Multipart boundaries and part headers sent around the file itself
+FORM_OVERHEAD_BYTES = 64 * 1024
+# Largest request body per endpoint; the exact per-file limit is still checked while saving
+BODY_LIMITS = {
+    "/upload": MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES,
+    "/batches": BATCH_MAX_BYTES + BATCH_MAX_FILES * FORM_OVERHEAD_BYTES
+}
+# Endpoints feeding the background (batch) queue rather than the interactive one
+BACKGROUND_PATHS = {"/batches"}
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Request body exceeds the {limit} byte limit")
+
+class UploadLimitMiddleware:
+    """Reject uploads before their body is spooled.
+
+    A full transcription queue (the background one, for batches) gets 429,
+    and a declared Content-Length over the limit gets 413, without reading
+    the body. Bodies without a length (chunked transfer) are counted as they
+    arrive and cut off at the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = BODY_LIMITS.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scheduler.is_full(background=scope["path"] in BACKGROUND_PATHS):
+            response = JSONResponse(
+                {"detail": "Too many files waiting to be processed. Please try again later."},
+                status_code=429, headers={"Retry-After": "30"}
+            )
+            await response(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            error = _too_large(limit)
+            await JSONResponse({"detail": error.detail}, status_code=error.status_code)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside form parsing, so the route's exception handling sends the 413
+                    raise _too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,24 +1,60 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, BackgroundTasks, Query, Request, Response, Header
+from fastapi.responses import HTMLResponse, StreamingResponse, PlainTextResponse
+from sqlalchemy import and_, or_, select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from datetime import datetime
-from typing import List
+from typing import List, Optional
+from pydantic import TypeAdapter
+import asyncio
+import base64
+import json
 import os
 from werkzeug.utils import secure_filename
-import threading
 
-from app.database import get_db, SessionLocal
-from app.models import Meeting
-from app.schemas import MeetingResponse, UploadResponse
-from app.services.transcription import process_audio_file
+from app.database import get_async_db
+from app.models import Meeting, TranscriptSegment
+from app.schemas import MeetingListItem, UploadResponse, SegmentPage, SearchResult, StatusResponse, BatchResponse, BatchStatus
+from app.services.jobs import scheduler
+from app.services.uploads import (
+    save_upload, extract_audio, wav_seconds, allowed_file, new_task_id, UploadTooLargeError, ALLOWED_EXTENSIONS
+)
+from app.services.transcription import transcript_cache_key, transcription_options
+from app.services.profiles import PROFILE_CHOICES, requested_profile, choose_profile, profile_model
+from app.services.whisper_engine import AVAILABLE_MODELS
+from app.config import WHISPER_UPLOAD_MODEL
+from app.services.cache import transcript_cache
+from app.services.search import search_meetings
+from app.services.storage import delete_meeting_files, file_size
+from app.services.batches import (
+    BatchSourceError, resolve_import_path, plan_import, copy_import, save_uploads,
+    create_batch, batch_progress
+)
+from app.services.timing import timed, traced, current_spans
+from app.services.metrics import render_metrics
+from app.services.progress import hub, status_payload, final_payload, TERMINAL_STATUSES
+from app.services.response_cache import response_cache, response_cache_requests, render_json, make_etag, etag_matches
 
 router = APIRouter()
 
 UPLOAD_FOLDER = "uploads"
-ALLOWED_EXTENSIONS = {'mp3', 'wav', 'mp4', 'm4a', 'webm', 'ogg'}
+# Comment line sent on idle event streams so proxies don't close them
+SSE_KEEPALIVE_SECONDS = 15
 
-def allowed_file(filename: str) -> bool:
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+_meeting_list = TypeAdapter(List[MeetingListItem])
+# Running server-side batch copies; referenced here so they aren't garbage-collected mid-copy
+_batch_copies: set[asyncio.Task] = set()
+
+def encode_cursor(meeting: Meeting) -> str:
+    raw = f"{meeting.created_at.isoformat() if meeting.created_at else ''}|{meeting.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[Optional[datetime], int]:
+    try:
+        created_at, meeting_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return (datetime.fromisoformat(created_at) if created_at else None), int(meeting_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/", response_class=HTMLResponse)
 async def root():
@@ -37,90 +73,372 @@ async def root():
     """
 
 @router.post("/upload", response_model=UploadResponse)
+@traced
 async def upload_file(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    model: Optional[str] = Query(None, description="Whisper model size; defaults to the profile's model"),
+    profile: Optional[str] = Query(None, description="fast, balanced, accurate or auto; defaults to WHISPER_PROFILE"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file selected")
     
     if not allowed_file(file.filename):
-        raise HTTPException(status_code=400, detail="Invalid file type. Allowed: mp3, wav, mp4, m4a, webm, ogg")
+        raise HTTPException(status_code=400, detail=f"Invalid file type. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))}")
+    
+    if model and model not in AVAILABLE_MODELS:
+        raise HTTPException(status_code=400, detail=f"Unknown model. Allowed: {', '.join(AVAILABLE_MODELS)}")
+    
+    profile = requested_profile(profile)
+    if profile not in PROFILE_CHOICES:
+        raise HTTPException(status_code=400, detail=f"Unknown profile. Allowed: {', '.join(PROFILE_CHOICES)}")
+    
+    if scheduler.is_full():
+        raise HTTPException(
+            status_code=429,
+            detail="Too many files waiting to be processed. Please try again later.",
+            headers={"Retry-After": "30"}
+        )
     
     # Save file
     filename = secure_filename(file.filename)
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    unique_filename = f"{timestamp}_{filename}"
+    task_id = new_task_id()
+    unique_filename = f"{task_id}_{filename}"
     filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
     
     os.makedirs(UPLOAD_FOLDER, exist_ok=True)
     
-    with open(filepath, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    try:
+        with timed('upload_write'):
+            file_bytes, content_hash = await save_upload(file, filepath)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    # Normalize to 16 kHz mono so transcription doesn't decode the container again,
+    # unless the transcript for this exact content is already cached
+    audio_path = os.path.splitext(filepath)[0] + "_16k.wav"
+    decoded = None
+    if profile == 'auto':
+        # Auto picks by duration, so decode before the cache check
+        with timed('decode'):
+            decoded = await extract_audio(filepath, audio_path)
+        profile = choose_profile(wav_seconds(audio_path) if decoded else None, len(scheduler.transcription_queue))
+        print(f"🎚️ Auto profile for {filename}: {profile}")
+    model = model or profile_model(profile) or WHISPER_UPLOAD_MODEL
+    
+    if transcript_cache.contains(transcript_cache_key(content_hash, model, transcription_options(profile))):
+        if decoded:
+            os.remove(audio_path)
+        audio_path = None
+    elif decoded is False:
+        audio_path = None
+    elif decoded is None:
+        with timed('decode'):
+            if not await extract_audio(filepath, audio_path):
+                audio_path = None
     
     # Create database entry
     meeting = Meeting(
-        task_id=timestamp,
+        task_id=task_id,
         filename=unique_filename,
         file_path=filepath,
         status='uploaded',
-        recording_type='upload'
+        recording_type='upload',
+        content_hash=content_hash,
+        audio_path=audio_path,
+        whisper_model=model,
+        profile=profile,
+        storage_tier='original',
+        file_bytes=file_bytes,
+        audio_bytes=file_size(audio_path)
     )
+    meeting.add_trace_spans(current_spans())
     db.add(meeting)
-    db.commit()
-    db.refresh(meeting)
+    with timed('db_commit'):
+        await db.commit()
     
-    # Process in background thread
-    def process_in_thread():
-        db_thread = SessionLocal()
-        try:
-            process_audio_file(filepath, timestamp, db_thread)
-        finally:
-            db_thread.close()
-    
-    thread = threading.Thread(target=process_in_thread)
-    thread.start()
+    # Queue for processing; the file is already saved, so don't reject it now
+    scheduler.submit(task_id, force=True)
+    queue_position = scheduler.queue_position(task_id)
+    hub.publish(task_id, 'uploaded', 0, queue_position=queue_position)
     
     return UploadResponse(
         success=True,
-        task_id=timestamp,
-        message="File uploaded successfully. Processing started."
+        task_id=task_id,
+        message="File uploaded successfully. Processing queued.",
+        queue_position=queue_position,
+        profile=profile
     )
 
-@router.get("/status/{task_id}")
-async def check_status(task_id: str, db: Session = Depends(get_db)):
-    meeting = db.query(Meeting).filter(Meeting.task_id == task_id).first()
-    if not meeting:
+@router.post("/batches", response_model=BatchResponse)
+async def create_batch_import(
+    files: List[UploadFile] = File(None),
+    path: Optional[str] = Form(None, description="Directory or zip archive under BATCH_IMPORT_DIR"),
+    model: Optional[str] = Query(None, description="Whisper model size; defaults to the profile's model"),
+    profile: Optional[str] = Query(None, description="fast, balanced, accurate or auto; defaults to WHISPER_PROFILE"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Import many recordings at once; they are processed after interactive uploads"""
+    if bool(files) == bool(path):
+        raise HTTPException(status_code=400, detail="Send either files or a server-side path")
+    if model and model not in AVAILABLE_MODELS:
+        raise HTTPException(status_code=400, detail=f"Unknown model. Allowed: {', '.join(AVAILABLE_MODELS)}")
+    profile = requested_profile(profile)
+    if profile not in PROFILE_CHOICES:
+        raise HTTPException(status_code=400, detail=f"Unknown profile. Allowed: {', '.join(PROFILE_CHOICES)}")
+    
+    if scheduler.is_full(background=True):
+        raise HTTPException(
+            status_code=429,
+            detail="Too many batch recordings waiting to be processed. Please try again later.",
+            headers={"Retry-After": "300"}
+        )
+    
+    try:
+        if path:
+            source = resolve_import_path(path)
+            imported, skipped = await asyncio.to_thread(plan_import, source)
+        else:
+            imported, skipped = await save_uploads(files)
+    except BatchSourceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if not imported:
+        raise HTTPException(status_code=400, detail="No supported recordings found")
+    
+    if profile == 'auto':
+        # One profile for the whole batch, judged by the backlog it creates
+        profile = choose_profile(None, len(scheduler.transcription_queue) + len(imported))
+    model = model or profile_model(profile) or WHISPER_UPLOAD_MODEL
+    status = 'importing' if path else 'uploaded'
+    batch = await create_batch(db, path or "upload", imported, model, profile, status=status)
+    for item in imported:
+        hub.publish(item['task_id'], status, 0)
+    if path:
+        # Respond with the batch id now; recordings are queued as they are copied
+        task = asyncio.create_task(asyncio.to_thread(copy_import, source, imported, _queue_background))
+        _batch_copies.add(task)
+        task.add_done_callback(_batch_copies.discard)
+    else:
+        for item in imported:
+            scheduler.submit(item['task_id'], background=True)
+    print(f"📦 Queued batch {batch.batch_id} with {len(imported)} recording(s)")
+    
+    return BatchResponse(
+        batch_id=batch.batch_id,
+        total=len(imported),
+        task_ids=[item['task_id'] for item in imported],
+        skipped=skipped
+    )
+
+def _queue_background(task_id: str):
+    scheduler.submit(task_id, background=True)
+
+@router.get("/batches/{batch_id}", response_model=BatchStatus)
+async def get_batch(batch_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Aggregate progress and throughput of a batch import"""
+    progress = await batch_progress(db, batch_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return progress
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _json_response(body: bytes, etag: str, if_none_match: Optional[str], headers: Optional[dict] = None) -> Response:
+    """Body with its ETag, or 304 when the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+    if etag_matches(if_none_match, etag):
+        response_cache_requests.inc(result="not_modified")
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+def _cached(key: str, if_none_match: Optional[str]) -> Optional[Response]:
+    """Serve a completed meeting's response from memory, without touching the database"""
+    cached = response_cache.get(key)
+    if cached is None:
+        response_cache_requests.inc(result="miss")
+        return None
+    response_cache_requests.inc(result="hit")
+    return _json_response(*cached, if_none_match)
+
+@router.get("/status/{task_id}", response_model=StatusResponse, response_model_exclude_none=True)
+async def check_status(
+    task_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Current stage and progress; transcript and summary are included once completed"""
+    key = f"status:{task_id}"
+    cached = _cached(key, if_none_match)
+    if cached:
+        return cached
+    generation = response_cache.generation()
+    
+    status = await status_payload(db, task_id)
+    if not status:
         raise HTTPException(status_code=404, detail="Task not found")
-    return meeting.to_dict()
+    status['queue_position'] = scheduler.queue_position(task_id)
+    if status['status'] != 'completed':
+        return status
+    
+    body = render_json(StatusResponse.model_validate(status).model_dump(mode="json", exclude_none=True))
+    return _json_response(body, response_cache.put(key, task_id, body, generation), if_none_match)
+
+def _sse(event: dict) -> str:
+    return f"data: {json.dumps(event)}\n\n"
 
-@router.get("/meetings", response_model=List[MeetingResponse])
-async def get_meetings(db: Session = Depends(get_db)):
-    meetings = db.query(Meeting).order_by(Meeting.created_at.desc()).all()
-    return [meeting.to_dict() for meeting in meetings]
+@router.get("/events/{task_id}")
+async def task_events(task_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Server-Sent Events stream of a task's progress, ending once it completes or fails"""
+    # Subscribe before reading the snapshot so no event falls in between
+    subscription = hub.subscribe(task_id)
+    snapshot = await status_payload(db, task_id)
+    if not snapshot:
+        subscription.close()
+        raise HTTPException(status_code=404, detail="Task not found")
+    snapshot['queue_position'] = scheduler.queue_position(task_id)
+    
+    async def stream():
+        try:
+            yield _sse(snapshot)
+            if snapshot['status'] in TERMINAL_STATUSES:
+                return
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                elif event['status'] in TERMINAL_STATUSES:
+                    yield _sse(await final_payload(task_id) or event)
+                    return
+                else:
+                    yield _sse(event)
+        finally:
+            subscription.close()
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/meetings", response_model=List[MeetingListItem])
+async def get_meetings(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    status: Optional[str] = None,
+    recording_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Newest-first meeting list without transcripts; full records come from /meeting/{id}
+
+    Pages mix in-progress meetings, so they are not cached; the ETag only
+    spares an unchanged page from being sent again.
+    """
+    query = select(Meeting).options(load_only(*(getattr(Meeting, c) for c in Meeting.LIST_COLUMNS)))
+    if status:
+        query = query.where(Meeting.status == status)
+    if recording_type:
+        query = query.where(Meeting.recording_type == recording_type)
+    if created_after:
+        query = query.where(Meeting.created_at >= created_after)
+    if created_before:
+        query = query.where(Meeting.created_at < created_before)
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(or_(
+            Meeting.created_at < cursor_created_at,
+            and_(Meeting.created_at == cursor_created_at, Meeting.id < cursor_id)
+        ))
+    
+    query = query.order_by(Meeting.created_at.desc(), Meeting.id.desc()).limit(limit + 1)
+    meetings = (await db.execute(query)).scalars().all()
+    headers = {}
+    if len(meetings) > limit:
+        meetings = meetings[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(meetings[-1])
+    body = render_json(_meeting_list.dump_python(
+        _meeting_list.validate_python([meeting.to_list_dict() for meeting in meetings]), mode="json"
+    ))
+    return _json_response(body, make_etag(body), if_none_match, headers)
+
+@router.get("/search", response_model=List[SearchResult])
+async def search(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Ranked full-text search over filenames, transcripts and summaries.
+
+    Snippets are HTML: the meeting text is escaped and matches are wrapped in <mark>.
+    """
+    return await search_meetings(db, q, limit, offset)
 
 @router.get("/meeting/{meeting_id}")
-async def get_meeting(meeting_id: int, db: Session = Depends(get_db)):
-    meeting = db.query(Meeting).filter(Meeting.id == meeting_id).first()
+async def get_meeting(
+    meeting_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    key = f"meeting:{meeting_id}"
+    cached = _cached(key, if_none_match)
+    if cached:
+        return cached
+    generation = response_cache.generation()
+    
+    meeting = await db.get(Meeting, meeting_id)
     if not meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
-    return meeting.to_dict()
+    if meeting.status != 'completed':
+        return meeting.to_dict()
+    
+    body = render_json(meeting.to_dict())
+    return _json_response(body, response_cache.put(key, meeting.task_id, body, generation), if_none_match)
+
+@router.get("/meeting/{meeting_id}/segments", response_model=SegmentPage)
+async def get_meeting_segments(
+    meeting_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    start: Optional[float] = Query(None, ge=0, description="Only segments ending after this time (seconds)"),
+    end: Optional[float] = Query(None, ge=0, description="Only segments starting before this time (seconds)"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not (await db.execute(select(Meeting.id).where(Meeting.id == meeting_id))).first():
+        raise HTTPException(status_code=404, detail="Meeting not found")
+    
+    query = select(TranscriptSegment).where(TranscriptSegment.meeting_id == meeting_id)
+    if start is not None:
+        query = query.where(TranscriptSegment.end > start)
+    if end is not None:
+        query = query.where(TranscriptSegment.start < end)
+    
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    segments = (await db.execute(
+        query.order_by(TranscriptSegment.start, TranscriptSegment.id).offset(offset).limit(limit)
+    )).scalars().all()
+    return {
+        'meeting_id': meeting_id,
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'segments': [segment.to_dict() for segment in segments]
+    }
 
 @router.delete("/meeting/{meeting_id}")
-async def delete_meeting(meeting_id: int, db: Session = Depends(get_db)):
-    meeting = db.query(Meeting).filter(Meeting.id == meeting_id).first()
+async def delete_meeting(meeting_id: int, db: AsyncSession = Depends(get_async_db)):
+    meeting = await db.get(Meeting, meeting_id)
     if not meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
     
-    # Delete file if exists
-    if os.path.exists(meeting.file_path):
-        try:
-            os.remove(meeting.file_path)
-        except Exception as e:
-            print(f"Error deleting file: {e}")
+    delete_meeting_files(meeting)
     
-    db.delete(meeting)
-    db.commit()
+    await db.execute(delete(TranscriptSegment).where(TranscriptSegment.meeting_id == meeting_id))
+    await db.delete(meeting)
+    await db.commit()
+    response_cache.invalidate(meeting.task_id)
     
     return {"success": True, "message": "Meeting deleted"}
@@ -1,18 +1,40 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from datetime import datetime
 import base64
+import json
 import os
 import asyncio
 
-from app.database import SessionLocal
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
 from app.models import Meeting
-from app.services.transcription import process_live_recording
+from app.services.transcription import finish_streaming_transcript
+from app.services.jobs import scheduler
+from app.services.streaming import LiveTranscriber
+from app.services.recordings import chunk_store, check_seq, parse_binary_frame, SequenceGapError
+from app.services.progress import hub, status_payload, final_payload, TERMINAL_STATUSES
+from app.services.whisper_engine import AVAILABLE_MODELS
+from app.services.metrics import gauge
+from app.services.uploads import new_task_id
+from app.services.profiles import PROFILE_CHOICES, requested_profile, choose_profile, profile_model, decode_options
+from app.services.storage import file_size
+from app.config import WHISPER_LIVE_MODEL, LIVE_RESUME_GRACE_SECONDS
 
 router = APIRouter()
 
+# Streaming-mode sessions, keyed by session_id
+live_transcribers: dict[str, LiveTranscriber] = {}
+# Connection sending each open recording, and the pending stop of recordings whose connection dropped
+session_owners: dict[str, WebSocket] = {}
+abandoned_recordings: dict[str, asyncio.Task] = {}
+# Stopped recordings being handed to the workers; referenced so they aren't garbage-collected
+processing_recordings: set[asyncio.Task] = set()
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: list[WebSocket] = []
+        # Progress forwarding tasks per connection, keyed by task_id
+        self.subscriptions: dict[WebSocket, dict[str, asyncio.Task]] = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
@@ -22,44 +44,368 @@ class ConnectionManager:
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        for task in self.subscriptions.pop(websocket, {}).values():
+            task.cancel()
         print(f"❌ Client disconnected. Total connections: {len(self.active_connections)}")
 
     async def send_message(self, message: dict, websocket: WebSocket):
         await websocket.send_json(message)
 
+    def subscribe(self, websocket: WebSocket, task_id: str, subscription, live: bool = False):
+        """Forward a task's progress events to this connection until it finishes.
+
+        With `live`, the final event is sent as the live recording protocol's
+        processing_complete (or an error) instead of a status payload.
+        """
+        tasks = self.subscriptions.setdefault(websocket, {})
+        if task_id in tasks and not tasks[task_id].done():
+            subscription.close()
+            return
+        tasks[task_id] = asyncio.create_task(self._forward(websocket, task_id, subscription, live))
+
+    def unsubscribe(self, websocket: WebSocket, task_id: str):
+        task = self.subscriptions.get(websocket, {}).pop(task_id, None)
+        if task:
+            task.cancel()
+
+    async def _forward(self, websocket: WebSocket, task_id: str, subscription, live: bool = False):
+        try:
+            async for event in subscription:
+                if event['status'] in TERMINAL_STATUSES:
+                    payload = await final_payload(task_id) or event
+                    await self.send_message(live_result(task_id, payload) if live else payload, websocket)
+                    return
+                await self.send_message(event, websocket)
+        except Exception as e:
+            print(f"Could not send progress for {task_id}: {str(e)}")
+        finally:
+            subscription.close()
+            tasks = self.subscriptions.get(websocket, {})
+            if tasks.get(task_id) is asyncio.current_task():
+                del tasks[task_id]
+
 manager = ConnectionManager()
 
+gauge("websocket_connections", "Open /ws connections", lambda: len(manager.active_connections))
+gauge("live_recordings", "Live recording sessions with streaming transcription", lambda: len(live_transcribers))
+
+def live_result(session_id: str, payload: dict) -> dict:
+    """Final message of a live recording, built from its terminal status payload"""
+    if payload['status'] != 'completed':
+        return {
+            "type": "error",
+            "session_id": session_id,
+            "message": "Processing failed"
+        }
+    return {
+        "type": "processing_complete",
+        "session_id": session_id,
+        "summary": payload.get('summary'),
+        "transcript": payload.get('transcript')
+    }
+
+async def process_live_recording(session_id: str, transcriber=None):
+    """Hand a stopped recording to the job scheduler's workers.
+
+    A streaming session first finishes its transcript here (awaited, so the
+    loop stays free); otherwise the whole recording is transcribed by a
+    transcription worker with its own database session.
+    """
+    if transcriber is None:
+        scheduler.submit(session_id, force=True)
+    elif await finish_streaming_transcript(session_id, transcriber):
+        scheduler.submit_summary(session_id)
+
+async def stop_recording_session(db, session_id: str) -> bool:
+    """Close a live recording to new chunks and mark it for processing; False if it isn't recording"""
+    meeting = (await db.execute(select(Meeting).where(Meeting.task_id == session_id))).scalars().first()
+    if not meeting or meeting.status != 'recording':
+        return False
+    
+    chunk_store.close(session_id)
+    session_owners.pop(session_id, None)
+    timer = abandoned_recordings.pop(session_id, None)
+    if timer:
+        timer.cancel()
+    meeting.status = 'processing'
+    meeting.file_bytes = await asyncio.to_thread(file_size, meeting.file_path)
+    await db.commit()
+    
+    print(f"⏹️ Stopped recording session: {session_id}")
+    return True
+
+def dispatch_recording(session_id: str):
+    task = asyncio.create_task(
+        process_live_recording(session_id, transcriber=live_transcribers.pop(session_id, None))
+    )
+    processing_recordings.add(task)
+    task.add_done_callback(processing_recordings.discard)
+
+async def _stop_abandoned(session_id: str):
+    await asyncio.sleep(LIVE_RESUME_GRACE_SECONDS)
+    # Past the grace period a resume can no longer cancel the stop
+    abandoned_recordings.pop(session_id, None)
+    async with AsyncSessionLocal() as db:
+        if await stop_recording_session(db, session_id):
+            print(f"⌛ Recording {session_id} was not resumed; processing the audio received")
+            dispatch_recording(session_id)
+        else:
+            chunk_store.close(session_id)
+            live_transcribers.pop(session_id, None)
+
+def abandon_recordings(websocket: WebSocket):
+    """Give the open recordings of a dropped connection a grace period to be resumed"""
+    for session_id, owner in list(session_owners.items()):
+        if owner is websocket:
+            del session_owners[session_id]
+            abandoned_recordings[session_id] = asyncio.create_task(_stop_abandoned(session_id))
+
+def _partial_sender(websocket: WebSocket):
+    async def send_partial(message: dict):
+        try:
+            await manager.send_message(message, websocket)
+        except Exception as e:
+            print(f"Could not send partial transcript: {str(e)}")
+    return send_partial
+
+def _decode_audio_blob(audio_blob: str) -> bytes:
+    return base64.b64decode(
+        audio_blob.split(',')[1] if ',' in audio_blob else audio_blob
+    )
+
+def _write_recording(filepath: str, audio_bytes: bytes):
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, 'wb') as f:
+        f.write(audio_bytes)
+
+async def store_chunk(websocket: WebSocket, session_id: str, audio_bytes, seq=None):
+    """Append a sequenced chunk to a live recording and acknowledge it"""
+    if chunk_store.get(session_id) is None:
+        await manager.send_message({
+            "type": "error",
+            "message": f"Unknown recording session: {session_id}"
+        }, websocket)
+        return
+
+    try:
+        stored = await chunk_store.append(session_id, audio_bytes, seq)
+    except SequenceGapError as e:
+        await manager.send_message({
+            "type": "error",
+            "message": str(e),
+            "session_id": session_id,
+            "expected_seq": e.expected_seq
+        }, websocket)
+        return
+    except Exception as e:
+        print(f"Error saving audio chunk: {str(e)}")
+        await manager.send_message({
+            "type": "error",
+            "message": f"Error saving audio chunk: {str(e)}"
+        }, websocket)
+        return
+
+    state = chunk_store.get(session_id)
+    await manager.send_message({
+        "type": "chunk_saved",
+        "session_id": session_id,
+        "seq": seq if seq is not None else state.next_seq - 1,
+        "duplicate": not stored,
+        "bytes_received": state.bytes_received
+    }, websocket)
+
+    transcriber = live_transcribers.get(session_id)
+    if stored and transcriber:
+        transcriber.notify_audio()
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
-    db = SessionLocal()
+    db = AsyncSessionLocal()
     
     try:
         while True:
-            data = await websocket.receive_json()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            
+            if message.get("bytes") is not None:
+                # Binary protocol: [uint16 header length][JSON header][raw audio]
+                try:
+                    header, audio_bytes = parse_binary_frame(message["bytes"])
+                except ValueError as e:
+                    await manager.send_message({
+                        "type": "error",
+                        "message": f"Invalid binary frame: {str(e)}"
+                    }, websocket)
+                    continue
+                await store_chunk(websocket, header.get("session_id"), audio_bytes, header.get("seq"))
+                continue
+            
+            data = json.loads(message["text"])
             event_type = data.get("type")
             
             if event_type == "start_recording":
-                session_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+                model = data.get("model")
+                if model and model not in AVAILABLE_MODELS:
+                    await manager.send_message({
+                        "type": "error",
+                        "message": f"Unknown model: {model}"
+                    }, websocket)
+                    continue
+                
+                profile = requested_profile(data.get("profile"))
+                if profile not in PROFILE_CHOICES:
+                    await manager.send_message({
+                        "type": "error",
+                        "message": f"Unknown profile: {profile}"
+                    }, websocket)
+                    continue
+                if profile == 'auto':
+                    # The length of a live meeting isn't known yet; go by the queue alone
+                    profile = choose_profile(None, len(scheduler.transcription_queue))
+                model = model or profile_model(profile) or WHISPER_LIVE_MODEL
+                
+                session_id = new_task_id()
                 
                 meeting = Meeting(
                     task_id=session_id,
                     filename=f"{session_id}_recording.webm",
                     file_path=f"uploads/{session_id}_recording.webm",
                     status='recording',
-                    recording_type='live'
+                    recording_type='live',
+                    whisper_model=model,
+                    profile=profile,
+                    storage_tier='original'
                 )
                 db.add(meeting)
-                db.commit()
+                await db.commit()
+                
+                chunk_store.open(session_id, meeting.file_path)
+                session_owners[session_id] = websocket
+                
+                streaming = bool(data.get("streaming"))
+                if streaming:
+                    live_transcribers[session_id] = LiveTranscriber(
+                        session_id, meeting.file_path, on_partial=_partial_sender(websocket),
+                        model_size=model, decode_options=decode_options(profile)
+                    )
                 
                 print(f"🎙️ Started recording session: {session_id}")
                 
                 await manager.send_message({
                     "type": "recording_started",
-                    "session_id": session_id
+                    "session_id": session_id,
+                    "streaming": streaming,
+                    "model": model,
+                    "profile": profile
+                }, websocket)
+            
+            elif event_type == "resume_recording":
+                # Reconnected client: report where to continue sending chunks
+                session_id = data.get("session_id")
+                state = chunk_store.get(session_id)
+                
+                if state is None:
+                    # Already stopped: deliver the result to this connection instead
+                    subscription = hub.subscribe(session_id)
+                    snapshot = await status_payload(db, session_id)
+                    if snapshot is None or snapshot.get("recording_type") != 'live' or snapshot["status"] == 'recording':
+                        subscription.close()
+                        await manager.send_message({
+                            "type": "error",
+                            "message": f"Unknown recording session: {session_id}"
+                        }, websocket)
+                        continue
+                    
+                    print(f"🔁 Reattached to processing session: {session_id}")
+                    
+                    if snapshot["status"] in TERMINAL_STATUSES:
+                        subscription.close()
+                        await manager.send_message(live_result(session_id, snapshot), websocket)
+                    else:
+                        await manager.send_message({
+                            "type": "processing_resumed",
+                            "session_id": session_id,
+                            "status": snapshot["status"],
+                            "progress": snapshot.get("progress")
+                        }, websocket)
+                        manager.subscribe(websocket, session_id, subscription, live=True)
+                    continue
+                
+                timer = abandoned_recordings.pop(session_id, None)
+                if timer:
+                    timer.cancel()
+                session_owners[session_id] = websocket
+                transcriber = live_transcribers.get(session_id)
+                if transcriber:
+                    transcriber.on_partial = _partial_sender(websocket)
+                
+                print(f"🔁 Resumed recording session: {session_id}")
+                
+                await manager.send_message({
+                    "type": "recording_resumed",
+                    "session_id": session_id,
+                    "next_seq": state.next_seq,
+                    "bytes_received": state.bytes_received,
+                    "streaming": transcriber is not None
                 }, websocket)
             
+            elif event_type == "subscribe":
+                # Push progress for an upload or recording instead of polling /status
+                task_id = data.get("task_id")
+                
+                if not task_id:
+                    await manager.send_message({
+                        "type": "error",
+                        "message": "Missing task_id"
+                    }, websocket)
+                    continue
+                
+                # Subscribe before reading the snapshot; events in between stay queued
+                subscription = hub.subscribe(task_id)
+                snapshot = await status_payload(db, task_id)
+                if snapshot is None:
+                    subscription.close()
+                    await manager.send_message({
+                        "type": "error",
+                        "message": f"Unknown task: {task_id}"
+                    }, websocket)
+                    continue
+                
+                await manager.send_message(snapshot, websocket)
+                if snapshot["status"] in TERMINAL_STATUSES:
+                    subscription.close()
+                else:
+                    manager.subscribe(websocket, task_id, subscription)
+            
+            elif event_type == "unsubscribe":
+                manager.unsubscribe(websocket, data.get("task_id"))
+            
+            elif event_type == "audio_chunk":
+                # Chunked mode over JSON: each message carries only the newly recorded audio
+                session_id = data.get("session_id")
+                audio_blob = data.get("audio_blob")
+                
+                if not session_id or not audio_blob:
+                    await manager.send_message({
+                        "type": "error",
+                        "message": "Missing session_id or audio_blob"
+                    }, websocket)
+                    continue
+                
+                try:
+                    audio_bytes = await asyncio.to_thread(_decode_audio_blob, audio_blob)
+                    await store_chunk(websocket, session_id, audio_bytes, check_seq(data.get("seq")))
+                except Exception as e:
+                    print(f"Error saving audio chunk: {str(e)}")
+                    await manager.send_message({
+                        "type": "error",
+                        "message": f"Error saving audio chunk: {str(e)}"
+                    }, websocket)
+            
             elif event_type == "audio_data":
+                # Legacy mode: the message carries the whole recording so far
                 session_id = data.get("session_id")
                 audio_blob = data.get("audio_blob")
                 
@@ -71,16 +417,10 @@ async def websocket_endpoint(websocket: WebSocket):
                     continue
                 
                 try:
-                    # Decode base64 audio data
-                    audio_bytes = base64.b64decode(
-                        audio_blob.split(',')[1] if ',' in audio_blob else audio_blob
-                    )
-                    
-                    # Save to file
-                    os.makedirs("uploads", exist_ok=True)
+                    # Decode and save off the event loop; blobs can be very large
+                    audio_bytes = await asyncio.to_thread(_decode_audio_blob, audio_blob)
                     filepath = f"uploads/{session_id}_recording.webm"
-                    with open(filepath, 'wb') as f:
-                        f.write(audio_bytes)
+                    await asyncio.to_thread(_write_recording, filepath, audio_bytes)
                     
                     print(f"💾 Saved audio recording: {filepath} ({len(audio_bytes)} bytes)")
                     
@@ -89,7 +429,7 @@ async def websocket_endpoint(websocket: WebSocket):
                         "session_id": session_id,
                         "size": len(audio_bytes)
                     }, websocket)
-                    
+                
                 except Exception as e:
                     print(f"Error saving audio: {str(e)}")
                     await manager.send_message({
@@ -107,22 +447,21 @@ async def websocket_endpoint(websocket: WebSocket):
                     }, websocket)
                     continue
                 
-                meeting = db.query(Meeting).filter(Meeting.task_id == session_id).first()
-                if meeting:
-                    meeting.status = 'processing'
-                    db.commit()
-                
-                print(f"⏹️ Stopped recording session: {session_id}")
+                if not await stop_recording_session(db, session_id):
+                    await manager.send_message({
+                        "type": "error",
+                        "message": f"Unknown recording session: {session_id}"
+                    }, websocket)
+                    continue
                 
                 await manager.send_message({
                     "type": "recording_stopped",
                     "session_id": session_id
                 }, websocket)
                 
-                # Process in background
-                asyncio.create_task(
-                    process_live_recording(session_id, db, manager, websocket)
-                )
+                # Results reach whichever connection is subscribed when processing finishes
+                manager.subscribe(websocket, session_id, hub.subscribe(session_id), live=True)
+                dispatch_recording(session_id)
             
             else:
                 await manager.send_message({
@@ -136,4 +475,5 @@ async def websocket_endpoint(websocket: WebSocket):
         print(f"WebSocket error: {str(e)}")
         manager.disconnect(websocket)
     finally:
-        db.close()
+        abandon_recordings(websocket)
+        await db.close()
@@ -1,15 +1,82 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config import SQLALCHEMY_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, SQLITE_BUSY_TIMEOUT_MS
+from app.services.metrics import db_query_seconds
+
+# Async drivers used by the API for each sync URL scheme
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+_url = make_url(SQLALCHEMY_DATABASE_URL)
+_is_sqlite = _url.get_backend_name() == "sqlite"
+
+def _async_url(url):
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets API reads proceed while a worker is writing; busy_timeout makes
+    # concurrent writers wait instead of failing with "database is locked"
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def _time_queries(sync_engine, name: str):
+    """Record each statement's execution time, labelled by engine and statement type"""
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        db_query_seconds.observe(elapsed, engine=name, statement=kind)
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./meetings.db"
+    def failed(exception_context):
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
 
+    event.listen(sync_engine, "before_cursor_execute", before)
+    event.listen(sync_engine, "after_cursor_execute", after)
+    event.listen(sync_engine, "handle_error", failed)
+
+_engine_args = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_pre_ping": not _is_sqlite}
+
+# Sync engine: pipeline worker threads and startup schema management
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
+    _url,
+    connect_args={"check_same_thread": False} if _is_sqlite else {},
+    **_engine_args
 )
 
+# Async engine: request handlers on the event loop
+async_engine = create_async_engine(_async_url(_url), poolclass=AsyncAdaptedQueuePool, **_engine_args)
+
+if _is_sqlite:
+    event.listen(engine, "connect", _sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas)
+
+_time_queries(engine, "sync")
+_time_queries(async_engine.sync_engine, "async")
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # Dependency for routes
@@ -19,3 +86,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def add_missing_columns():
+    """Add model columns (and their indexes) missing from tables created by older versions"""
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
@@ -1,8 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from app.database import Base
 import json
 
+# SQLite stores CURRENT_TIMESTAMP as 'YYYY-MM-DD HH:MM:SS'; bind parameters in the
+# same format so keyset comparisons against created_at are exact
+CreatedAt = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite"
+)
+
 class Meeting(Base):
     __tablename__ = "meetings"
     
@@ -14,9 +22,69 @@ class Meeting(Base):
     transcript = Column(Text, nullable=True)
     summary_overview = Column(Text, nullable=True)
     summary_data = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(CreatedAt, server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     recording_type = Column(String(20), nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)
+    audio_path = Column(String(300), nullable=True)
+    audio_seconds = Column(Float, nullable=True)
+    skipped_seconds = Column(Float, nullable=True)
+    whisper_model = Column(String(50), nullable=True)
+    trace_data = Column(Text, nullable=True)
+    # Storage: 'original' until transcoded, then 'compact', and 'expired' once the audio is removed
+    storage_tier = Column(String(20), nullable=True)
+    # Failed transcodes; a meeting stays 'original' and is retried up to COMPACT_MAX_ATTEMPTS times
+    compact_attempts = Column(Integer, nullable=True)
+    file_bytes = Column(Integer, nullable=True)
+    audio_bytes = Column(Integer, nullable=True)
+    transcript_bytes = Column(Integer, nullable=True)
+    summary_bytes = Column(Integer, nullable=True)
+    audio_expired_at = Column(DateTime(timezone=True), nullable=True)
+    batch_id = Column(String(100), nullable=True, index=True)
+    # Path inside a server-side batch source, so an interrupted copy can be redone
+    source_name = Column(String(500), nullable=True)
+    profile = Column(String(20), nullable=True)
+    realtime_factor = Column(Float, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_meetings_created_at_id", "created_at", "id"),
+        Index("ix_meetings_status_created_at_id", "status", "created_at", "id"),
+    )
+    
+    # Columns needed for list views; transcript and summary_data stay deferred
+    LIST_COLUMNS = ('id', 'task_id', 'filename', 'status', 'summary_overview',
+                    'created_at', 'completed_at', 'recording_type')
+    
+    def to_list_dict(self):
+        return {
+            'id': self.id,
+            'task_id': self.task_id,
+            'filename': self.filename,
+            'status': self.status,
+            'summary_overview': self.summary_overview,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'recording_type': self.recording_type
+        }
+    
+    # Columns needed for status checks while a meeting is still processing
+    STATUS_COLUMNS = ('id', 'task_id', 'filename', 'status', 'created_at',
+                      'completed_at', 'recording_type')
+    
+    def to_status_dict(self, include_results: bool = False):
+        status = {
+            'id': self.id,
+            'task_id': self.task_id,
+            'filename': self.filename,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'recording_type': self.recording_type
+        }
+        if include_results:
+            status['transcript'] = self.transcript
+            status['summary'] = json.loads(self.summary_data) if self.summary_data else None
+        return status
     
     def to_dict(self):
         summary = json.loads(self.summary_data) if self.summary_data else None
@@ -29,5 +97,55 @@ class Meeting(Base):
             'summary': summary,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'recording_type': self.recording_type
+            'recording_type': self.recording_type,
+            'audio_seconds': self.audio_seconds,
+            'skipped_seconds': self.skipped_seconds,
+            'whisper_model': self.whisper_model,
+            'profile': self.profile,
+            'realtime_factor': self.realtime_factor,
+            'trace': json.loads(self.trace_data) if self.trace_data else None,
+            'storage_tier': self.storage_tier,
+            'storage_bytes': self.storage_bytes
+        }
+    
+    @property
+    def storage_bytes(self) -> int:
+        """Bytes on disk for the recording, its working copy, transcript and summary"""
+        return sum(size or 0 for size in (self.file_bytes, self.audio_bytes, self.transcript_bytes, self.summary_bytes))
+    
+    def add_trace_spans(self, spans):
+        """Append timed spans to the meeting's stored trace"""
+        if spans:
+            self.trace_data = json.dumps((json.loads(self.trace_data) if self.trace_data else []) + spans)
+
+class Batch(Base):
+    __tablename__ = "batches"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String(100), unique=True, nullable=False, index=True)
+    source = Column(String(300), nullable=True)
+    total = Column(Integer, nullable=False)
+    created_at = Column(CreatedAt, server_default=func.now())
+
+class TranscriptSegment(Base):
+    __tablename__ = "transcript_segments"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    meeting_id = Column(Integer, ForeignKey("meetings.id", ondelete="CASCADE"), nullable=False)
+    start = Column(Float, nullable=False)
+    end = Column(Float, nullable=False)
+    text = Column(Text, nullable=False)
+    avg_logprob = Column(Float, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_transcript_segments_meeting_start", "meeting_id", "start"),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'start': self.start,
+            'end': self.end,
+            'text': self.text,
+            'avg_logprob': self.avg_logprob
         }
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 class SummaryData(BaseModel):
     overview: str
@@ -12,6 +12,11 @@ class MeetingBase(BaseModel):
     filename: str
     recording_type: Optional[str] = None
 
+class TraceSpan(BaseModel):
+    name: str
+    start: float
+    duration_ms: float
+
 class MeetingResponse(BaseModel):
     id: int
     task_id: str
@@ -22,16 +27,91 @@ class MeetingResponse(BaseModel):
     created_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     recording_type: Optional[str] = None
+    audio_seconds: Optional[float] = None
+    skipped_seconds: Optional[float] = None
+    whisper_model: Optional[str] = None
+    profile: Optional[str] = None
+    realtime_factor: Optional[float] = None
+    trace: Optional[List[TraceSpan]] = None
+    storage_tier: Optional[str] = None
+    storage_bytes: Optional[int] = None
     
     class Config:
         from_attributes = True
 
+class MeetingListItem(BaseModel):
+    id: int
+    task_id: str
+    filename: str
+    status: str
+    summary_overview: Optional[str] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    recording_type: Optional[str] = None
+
+class SearchResult(BaseModel):
+    id: int
+    task_id: str
+    filename: str
+    status: str
+    created_at: Optional[datetime] = None
+    recording_type: Optional[str] = None
+    rank: Optional[float] = None
+    transcript_snippet: Optional[str] = None
+    summary_snippet: Optional[str] = None
+
 class UploadResponse(BaseModel):
     success: bool
     task_id: str
     message: str
+    queue_position: Optional[int] = None
+    profile: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    batch_id: str
+    total: int
+    task_ids: List[str]
+    skipped: List[str] = []
+
+class BatchStatus(BaseModel):
+    batch_id: str
+    source: Optional[str] = None
+    total: int
+    counts: Dict[str, int]
+    completed: int
+    failed: int
+    remaining: int
+    progress: float
+    created_at: Optional[datetime] = None
+    elapsed_seconds: Optional[float] = None
+    files_per_minute: float
+    audio_seconds_per_second: float
+    eta_seconds: Optional[float] = None
 
 class StatusResponse(BaseModel):
+    id: Optional[int] = None
     task_id: str
+    filename: Optional[str] = None
     status: str
+    progress: Optional[float] = None
     message: Optional[str] = None
+    queue_position: Optional[int] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    recording_type: Optional[str] = None
+    transcript: Optional[str] = None
+    summary: Optional[SummaryData] = None
+
+class TranscriptSegmentResponse(BaseModel):
+    id: int
+    start: float
+    end: float
+    text: str
+    avg_logprob: Optional[float] = None
+
+class SegmentPage(BaseModel):
+    meeting_id: int
+    total: int
+    offset: int
+    limit: int
+    segments: List[TranscriptSegmentResponse]
@@ -0,0 +1,230 @@
+import hashlib
+import os
+import zipfile
+from datetime import datetime
+from typing import Callable, Optional
+
+from fastapi import UploadFile
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from werkzeug.utils import secure_filename
+
+from app.config import BATCH_IMPORT_DIR, BATCH_MAX_FILES, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES
+from app.database import SessionLocal
+from app.models import Batch, Meeting
+from app.services.storage import UPLOAD_DIR
+from app.services.progress import hub
+from app.services.uploads import allowed_file, new_task_id, save_upload, UploadTooLargeError
+
+class BatchSourceError(Exception):
+    """Raised when a batch source is empty, too large, not allowed or unreadable"""
+
+def _stored_path(task_id: str, name: str) -> str:
+    return os.path.join(UPLOAD_DIR, f"{task_id}_{secure_filename(os.path.basename(name)) or 'recording'}")
+
+def _copy(source, filepath: str, max_bytes: int = MAX_UPLOAD_BYTES) -> tuple[int, str]:
+    """Copy an open binary stream to disk; returns (size, sha256 hex digest).
+
+    Written under a temporary name and renamed when complete, so an
+    interrupted import never leaves a truncated recording behind.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    partial = filepath + ".part"
+    try:
+        with open(partial, "wb") as target:
+            for chunk in iter(lambda: source.read(UPLOAD_CHUNK_BYTES), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"File exceeds the {max_bytes} byte limit")
+                digest.update(chunk)
+                target.write(chunk)
+        os.replace(partial, filepath)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return size, digest.hexdigest()
+
+def resolve_import_path(path: str) -> str:
+    """Resolve a server-side path, which must lie under BATCH_IMPORT_DIR"""
+    if not BATCH_IMPORT_DIR:
+        raise BatchSourceError("Server-side imports are disabled; set BATCH_IMPORT_DIR")
+    root = os.path.realpath(BATCH_IMPORT_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise BatchSourceError("Import path must be inside BATCH_IMPORT_DIR")
+    if not os.path.exists(resolved):
+        raise BatchSourceError(f"Import path not found: {path}")
+    return resolved
+
+def plan_import(path: str, max_files: int = BATCH_MAX_FILES) -> tuple[list[dict], list[str]]:
+    """List the recordings in a directory (recursively) or zip archive, without copying them.
+
+    Returns one dict per recording, with the task id and upload path it will
+    get, and the names skipped for their file type.
+    """
+    if os.path.isdir(path):
+        names = sorted(
+            os.path.relpath(os.path.join(directory, filename), path)
+            for directory, _, filenames in os.walk(path) for filename in filenames
+        )
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            names = [info.filename for info in archive.infolist() if not info.is_dir()]
+    else:
+        raise BatchSourceError("Import path must be a directory or a zip archive")
+
+    planned = [name for name in names if allowed_file(name)]
+    if len(planned) > max_files:
+        raise BatchSourceError(f"More than {max_files} recordings in {path}")
+    imported = []
+    for name in planned:
+        task_id = new_task_id()
+        imported.append({'task_id': task_id, 'name': name, 'file_path': _stored_path(task_id, name)})
+    return imported, [name for name in names if not allowed_file(name)]
+
+def copy_planned(path: str, item: dict) -> tuple[int, str]:
+    """Copy one planned recording into uploads/ (blocking); returns (size, sha256 hex digest)"""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    if os.path.isdir(path):
+        with open(os.path.join(path, item['name']), "rb") as source:
+            return _copy(source, item['file_path'])
+    with zipfile.ZipFile(path) as archive, archive.open(item['name']) as source:
+        return _copy(source, item['file_path'])
+
+def copy_import(source: str, imported: list[dict], on_copied: Callable[[str], None]):
+    """Copy the 'importing' meetings of a server-side batch into uploads/ (blocking).
+
+    Each meeting becomes 'uploaded' and is handed to `on_copied` as soon as
+    its file is complete. A file that is too large or unreadable fails only
+    its own meeting; one deleted mid-copy has its copy removed.
+    """
+    for item in imported:
+        try:
+            size, content_hash = copy_planned(source, item)
+            values = {'status': 'uploaded', 'file_bytes': size, 'content_hash': content_hash}
+        except Exception as e:
+            print(f"⚠️ Could not import {item['name']}: {str(e)}")
+            values = {'status': 'error'}
+        db = SessionLocal()
+        try:
+            updated = db.query(Meeting).filter(
+                Meeting.task_id == item['task_id'], Meeting.status == 'importing'
+            ).update(values)
+            db.commit()
+        finally:
+            db.close()
+        if not updated:
+            # Deleted while it was being copied
+            remove_files([item])
+        elif values['status'] == 'error':
+            hub.publish(item['task_id'], 'error')
+        else:
+            hub.publish(item['task_id'], 'uploaded', 0)
+            on_copied(item['task_id'])
+
+async def save_uploads(files: list[UploadFile]) -> tuple[list[dict], list[str]]:
+    """Stream uploaded recordings into uploads/; returns stored files and skipped names"""
+    if len(files) > BATCH_MAX_FILES:
+        raise BatchSourceError(f"At most {BATCH_MAX_FILES} files per batch")
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    imported, skipped = [], []
+    try:
+        for file in files:
+            if not file.filename or not allowed_file(file.filename):
+                skipped.append(file.filename or "")
+                continue
+            task_id = new_task_id()
+            filepath = _stored_path(task_id, file.filename)
+            size, content_hash = await save_upload(file, filepath)
+            imported.append({
+                'task_id': task_id, 'name': file.filename, 'file_path': filepath,
+                'file_bytes': size, 'content_hash': content_hash
+            })
+    except BaseException:
+        remove_files(imported)
+        raise
+    return imported, skipped
+
+def remove_files(imported: list[dict]):
+    for item in imported:
+        try:
+            os.remove(item['file_path'])
+        except FileNotFoundError:
+            pass
+
+async def create_batch(
+    db: AsyncSession, source: str, imported: list[dict], model: str, profile: Optional[str] = None,
+    status: str = 'uploaded'
+) -> Batch:
+    """Insert the batch and all of its meetings in one transaction.
+
+    Meetings of a server-side import start as 'importing', until `copy_import` has copied their file.
+    """
+    batch = Batch(batch_id=f"batch_{new_task_id()}", source=source, total=len(imported))
+    db.add(batch)
+    db.add_all([
+        Meeting(
+            task_id=item['task_id'],
+            filename=os.path.basename(item['file_path']),
+            file_path=item['file_path'],
+            status=status,
+            recording_type='upload',
+            content_hash=item.get('content_hash'),
+            whisper_model=model,
+            profile=profile,
+            storage_tier='original',
+            file_bytes=item.get('file_bytes'),
+            batch_id=batch.batch_id,
+            source_name=item['name'] if status == 'importing' else None
+        )
+        for item in imported
+    ])
+    try:
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        remove_files(imported)
+        raise
+    return batch
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    return value.replace(tzinfo=None) if value else value
+
+async def batch_progress(db: AsyncSession, batch_id: str) -> Optional[dict]:
+    """Aggregate status counts and throughput of a batch, from one grouped query"""
+    batch = (await db.execute(select(Batch).where(Batch.batch_id == batch_id))).scalars().first()
+    if not batch:
+        return None
+    rows = (await db.execute(
+        select(Meeting.status, func.count(), func.sum(Meeting.audio_seconds), func.max(Meeting.completed_at))
+        .where(Meeting.batch_id == batch_id)
+        .group_by(Meeting.status)
+    )).all()
+    counts = {status: count for status, count, _, _ in rows}
+    completed, failed = counts.get('completed', 0), counts.get('error', 0)
+    finished = completed + failed
+    remaining = batch.total - finished
+    audio_seconds = sum(audio or 0 for status, _, audio, _ in rows if status == 'completed')
+
+    created_at = _naive(batch.created_at)
+    last_completed = max((_naive(last) for _, _, _, last in rows if last), default=None)
+    end = last_completed if remaining == 0 and last_completed else datetime.utcnow()
+    elapsed = max((end - created_at).total_seconds(), 1e-6) if created_at else None
+    rate = finished / elapsed if elapsed else 0.0
+    return {
+        'batch_id': batch.batch_id,
+        'source': batch.source,
+        'total': batch.total,
+        'counts': counts,
+        'completed': completed,
+        'failed': failed,
+        'remaining': remaining,
+        'progress': round(100 * finished / batch.total, 1) if batch.total else 100.0,
+        'created_at': batch.created_at.isoformat() if batch.created_at else None,
+        'elapsed_seconds': round(elapsed, 1) if elapsed else None,
+        'files_per_minute': round(60 * rate, 2),
+        'audio_seconds_per_second': round(audio_seconds / elapsed, 2) if elapsed else 0.0,
+        'eta_seconds': round(remaining / rate, 1) if rate and remaining else None
+    }
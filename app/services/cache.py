@@ -0,0 +1,99 @@
+import hashlib
+import os
+import shutil
+import threading
+from typing import Optional
+
+from app.config import CACHE_DIR, CACHE_MAX_BYTES
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def sha256_file(filepath: str, chunk_size: int = 1024 ** 2) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ArtifactCache:
+    """Content-addressed text cache on disk with size-bounded LRU eviction.
+
+    Recency is tracked through file modification times, which are bumped on
+    every hit, so the cache survives restarts without a separate index.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return sha256_text("\x1f".join(parts))
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+            os.utime(path)
+            return content
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, content: str):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def link(self, key: str, target: str) -> bool:
+        """Materialize a cached entry at `target`, hard-linking to share the bytes on disk"""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        if os.path.exists(target):
+            os.remove(target)
+        try:
+            os.link(path, target)
+        except OSError:
+            shutil.copyfile(path, target)
+        return True
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+transcript_cache = ArtifactCache(os.path.join(CACHE_DIR, "transcripts"), CACHE_MAX_BYTES // 2, ".txt")
+# Shares the transcripts directory (and its budget) with the plain-text entries
+segment_cache = ArtifactCache(os.path.join(CACHE_DIR, "transcripts"), CACHE_MAX_BYTES // 2, ".segments.json")
+summary_cache = ArtifactCache(os.path.join(CACHE_DIR, "summaries"), CACHE_MAX_BYTES // 2, ".json")
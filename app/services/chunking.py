@@ -0,0 +1,93 @@
+import numpy as np
+
+from app.services.streaming import merge_segments
+from app.services.vad import FRAME_SECONDS, frame_energy_db
+
+# Cut points are searched this far (as a share of the chunk length) around each target
+SEARCH_FRACTION = 0.1
+# Energy is averaged over this window so a cut lands in a pause, not between syllables
+SMOOTHING_SECONDS = 0.5
+# A file is only split when its last chunk would be at least this share of a chunk
+MIN_LAST_CHUNK = 0.25
+# Documented tolerance: word error rate of a chunked transcript measured
+# against a single-pass transcript of the same file
+CHUNKED_WER_TOLERANCE = 0.02
+
+def plan_chunks(
+    audio: np.ndarray,
+    sample_rate: int,
+    chunk_seconds: float,
+    overlap: float
+) -> list[tuple[float, float, float, float]]:
+    """Split audio into windows near `chunk_seconds` long, cut at the quietest point around each target.
+
+    Returns (start, end, own_start, own_end) in seconds: each window is
+    decoded from start to end, `overlap` seconds past its cuts, but only
+    owns the segments centred between its cuts.
+    """
+    duration = len(audio) / sample_rate
+    if duration <= chunk_seconds * (1 + MIN_LAST_CHUNK):
+        return [(0.0, duration, 0.0, duration)]
+
+    frame_length = int(sample_rate * FRAME_SECONDS)
+    smoothing = max(1, int(SMOOTHING_SECONDS / FRAME_SECONDS))
+    energy = np.convolve(frame_energy_db(audio, frame_length), np.ones(smoothing) / smoothing, mode="same")
+    search = int(chunk_seconds * SEARCH_FRACTION / FRAME_SECONDS)
+
+    cuts = [0.0]
+    while duration - cuts[-1] > chunk_seconds * (1 + MIN_LAST_CHUNK):
+        target = int((cuts[-1] + chunk_seconds) / FRAME_SECONDS)
+        lo, hi = max(target - search, 0), min(target + search, len(energy))
+        cuts.append(float((lo + np.argmin(energy[lo:hi])) * FRAME_SECONDS))
+    cuts.append(duration)
+
+    return [
+        (max(0.0, own_start - overlap), min(duration, own_end + overlap), own_start, own_end)
+        for own_start, own_end in zip(cuts, cuts[1:])
+    ]
+
+def stitch_chunks(windows: list[tuple[float, float, float, float]], results: list[dict]) -> dict:
+    """Join per-window results into one transcript on the original timeline.
+
+    Each window keeps the segments whose midpoint falls between its cuts;
+    words repeated across a cut by segments straddling it are dropped.
+    """
+    segments, words = [], []
+    speech_seconds = 0.0
+    last = len(windows) - 1
+    for i, ((_, _, own_start, own_end), result) in enumerate(zip(windows, results)):
+        owned = [
+            seg for seg in result["segments"]
+            if own_start <= (seg["start"] + seg["end"]) / 2 and ((seg["start"] + seg["end"]) / 2 < own_end or i == last)
+        ]
+        floor = segments[-1]["end"] if segments else 0.0
+        kept, new_words = merge_segments(words, owned, floor)
+        segments.extend(kept)
+        words.extend(new_words)
+        for start, end in result.get("speech_regions", ()):
+            speech_seconds += max(0.0, min(end, own_end) - max(start, own_start))
+
+    stitched = {"text": " ".join(words), "segments": segments}
+    if all("audio_seconds" in result for result in results):
+        stitched["audio_seconds"] = windows[-1][3]
+        stitched["speech_seconds"] = speech_seconds
+    return stitched
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level edit distance between two transcripts, relative to the reference length"""
+    ref = [w.lower().strip(".,!?;:\"'") for w in reference.split()]
+    hyp = [w.lower().strip(".,!?;:\"'") for w in hypothesis.split()]
+    if not ref:
+        return float(len(hyp) > 0)
+
+    # One DP row per reference word; insertions are resolved with a running minimum
+    hyp_ids = np.array([hash(w) for w in hyp], dtype=np.int64)
+    columns = np.arange(len(hyp) + 1)
+    previous = columns.copy()
+    for i, word in enumerate(ref, start=1):
+        substitution = previous[:-1] + (hyp_ids != hash(word))
+        current = np.empty_like(previous)
+        current[0] = i
+        current[1:] = np.minimum(substitution, previous[1:] + 1)
+        previous = np.minimum.accumulate(current - columns) + columns
+    return float(previous[-1]) / len(ref)
@@ -0,0 +1,228 @@
+import threading
+from collections import deque
+from typing import Optional
+
+from app.config import TRANSCRIPTION_WORKERS, SUMMARIZATION_WORKERS, MAX_QUEUED_JOBS, MAX_QUEUED_BATCH_JOBS
+from app.database import SessionLocal
+from app.models import Batch, Meeting
+from app.services.batches import BatchSourceError, copy_import, resolve_import_path
+from app.services.transcription import transcribe_meeting, summarize_meeting
+from app.services.metrics import gauge
+
+# Meeting statuses that mean a job was interrupted mid-pipeline
+TRANSCRIPTION_STATUSES = ('uploaded', 'processing', 'transcribing')
+SUMMARIZATION_STATUSES = ('summarizing',)
+
+class QueueFullError(Exception):
+    """Raised when a job queue has reached its capacity"""
+
+class JobQueue:
+    """Thread-safe FIFO of task ids waiting for a pipeline stage.
+
+    Background work (batch imports) waits in a second FIFO that is only
+    drained when no interactive work is pending, and doesn't count towards
+    `maxsize`; `background_maxsize` is only checked by `is_full`, before a
+    batch is accepted, so a batch is never cut in half.
+    """
+
+    def __init__(self, name: str, maxsize: int = 0, background_maxsize: int = 0):
+        self.name = name
+        self.maxsize = maxsize
+        self.background_maxsize = background_maxsize
+        self._pending: deque[str] = deque()
+        self._background: deque[str] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._pending) + len(self._background)
+
+    def depth(self) -> dict[str, int]:
+        with self._cond:
+            return {'interactive': len(self._pending), 'background': len(self._background)}
+
+    def is_full(self, background: bool = False) -> bool:
+        with self._cond:
+            if background:
+                return bool(self.background_maxsize) and len(self._background) >= self.background_maxsize
+            return bool(self.maxsize) and len(self._pending) >= self.maxsize
+
+    def put(self, task_id: str, force: bool = False, background: bool = False):
+        with self._cond:
+            if task_id in self._pending or task_id in self._background:
+                return
+            if background:
+                self._background.append(task_id)
+            else:
+                if not force and self.maxsize and len(self._pending) >= self.maxsize:
+                    raise QueueFullError(f"{self.name} queue is full")
+                self._pending.append(task_id)
+            self._cond.notify()
+
+    def get(self) -> Optional[str]:
+        """Block until a task id is available; returns None once the queue is closed"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._background or self._closed)
+            if self._closed:
+                return None
+            return (self._pending or self._background).popleft()
+
+    def position(self, task_id: str) -> Optional[int]:
+        with self._cond:
+            if task_id in self._pending:
+                return self._pending.index(task_id) + 1
+            if task_id in self._background:
+                return len(self._pending) + self._background.index(task_id) + 1
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+class JobScheduler:
+    """Runs the transcription and summarization stages on bounded worker pools"""
+
+    def __init__(self, transcription_workers: int, summarization_workers: int, max_queued: int,
+                 max_queued_background: int = 0):
+        self.transcription_workers = max(1, transcription_workers)
+        self.summarization_workers = max(1, summarization_workers)
+        self.transcription_queue = JobQueue("transcription", max_queued, max_queued_background)
+        # Only fed by finished transcriptions, which are already bounded upstream
+        self.summarization_queue = JobQueue("summarization")
+        # Task ids submitted as background work, kept at low priority through both stages
+        self._background: set[str] = set()
+        self._threads: list[threading.Thread] = []
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.transcription_workers):
+            self._spawn(f"transcription-worker-{i}", self._transcription_worker)
+        for i in range(self.summarization_workers):
+            self._spawn(f"summarization-worker-{i}", self._summarization_worker)
+        self.recover()
+        print(f"✅ Job scheduler started ({self.transcription_workers} transcription, "
+              f"{self.summarization_workers} summarization workers)")
+
+    def stop(self):
+        self.transcription_queue.close()
+        self.summarization_queue.close()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+
+    def is_full(self, background: bool = False) -> bool:
+        return self.transcription_queue.is_full(background)
+
+    def submit(self, task_id: str, force: bool = False, background: bool = False):
+        """Queue a meeting for transcription; raises QueueFullError when at capacity.
+
+        Background tasks run only when no interactive task is waiting.
+        """
+        if background:
+            self._background.add(task_id)
+        self.transcription_queue.put(task_id, force=force, background=background)
+
+    def submit_summary(self, task_id: str):
+        """Queue an already-transcribed meeting (a finished streaming session) for summarization"""
+        self.summarization_queue.put(task_id, force=True)
+
+    def queue_position(self, task_id: str) -> Optional[int]:
+        position = self.transcription_queue.position(task_id)
+        if position is None:
+            position = self.summarization_queue.position(task_id)
+        return position
+
+    def recover(self):
+        """Re-queue meetings left mid-pipeline by a previous run"""
+        db = SessionLocal()
+        try:
+            meetings = (
+                db.query(Meeting)
+                .filter(Meeting.status.in_(TRANSCRIPTION_STATUSES + SUMMARIZATION_STATUSES))
+                .order_by(Meeting.created_at.asc())
+                .all()
+            )
+            for meeting in meetings:
+                background = meeting.batch_id is not None
+                if background:
+                    self._background.add(meeting.task_id)
+                if meeting.status in SUMMARIZATION_STATUSES and meeting.transcript:
+                    self.summarization_queue.put(meeting.task_id, force=True, background=background)
+                else:
+                    self.transcription_queue.put(meeting.task_id, force=True, background=background)
+            if meetings:
+                print(f"♻️ Recovered {len(meetings)} interrupted job(s)")
+            self._resume_imports(db)
+        finally:
+            db.close()
+
+    def _resume_imports(self, db):
+        """Restart the copies of server-side batch imports interrupted by a previous run"""
+        importing = db.query(Meeting).filter(Meeting.status == 'importing').order_by(Meeting.id.asc()).all()
+        batches: dict[str, list[Meeting]] = {}
+        for meeting in importing:
+            batches.setdefault(meeting.batch_id, []).append(meeting)
+        for batch_id, meetings in batches.items():
+            batch = db.query(Batch).filter(Batch.batch_id == batch_id).first()
+            try:
+                source = resolve_import_path(batch.source) if batch else None
+            except BatchSourceError as e:
+                print(f"⚠️ Cannot resume batch {batch_id}: {str(e)}")
+                source = None
+            if source is None or not all(meeting.source_name for meeting in meetings):
+                for meeting in meetings:
+                    meeting.status = 'error'
+                db.commit()
+                continue
+            imported = [
+                {'task_id': meeting.task_id, 'name': meeting.source_name, 'file_path': meeting.file_path}
+                for meeting in meetings
+            ]
+            threading.Thread(
+                target=copy_import, args=(source, imported, lambda task_id: self.submit(task_id, background=True)),
+                name=f"batch-copy-{batch_id}", daemon=True
+            ).start()
+            print(f"♻️ Resuming the copy of {len(imported)} recording(s) from batch {batch_id}")
+
+    def _spawn(self, name: str, target):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _transcription_worker(self):
+        while True:
+            task_id = self.transcription_queue.get()
+            if task_id is None:
+                return
+            db = SessionLocal()
+            try:
+                if transcribe_meeting(task_id, db):
+                    self.summarization_queue.put(task_id, force=True, background=task_id in self._background)
+                else:
+                    self._background.discard(task_id)
+            finally:
+                db.close()
+
+    def _summarization_worker(self):
+        while True:
+            task_id = self.summarization_queue.get()
+            if task_id is None:
+                return
+            db = SessionLocal()
+            try:
+                summarize_meeting(task_id, db)
+            finally:
+                self._background.discard(task_id)
+                db.close()
+
+scheduler = JobScheduler(TRANSCRIPTION_WORKERS, SUMMARIZATION_WORKERS, MAX_QUEUED_JOBS, MAX_QUEUED_BATCH_JOBS)
+
+gauge("job_queue_depth", "Meetings waiting for each pipeline stage", lambda: {
+    queue.name: len(queue) for queue in (scheduler.transcription_queue, scheduler.summarization_queue)
+}, label="queue")
+gauge("background_queue_depth", "Batch-imported meetings waiting for each pipeline stage", lambda: {
+    queue.name: queue.depth()['background'] for queue in (scheduler.transcription_queue, scheduler.summarization_queue)
+}, label="queue")
@@ -0,0 +1,178 @@
+import abc
+import asyncio
+import importlib
+import json
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+import httpx
+
+from app.config import (
+    LLM_BACKEND, OLLAMA_URL, OLLAMA_MODEL, OLLAMA_TIMEOUT,
+    OLLAMA_MAX_RETRIES, OLLAMA_RETRY_BACKOFF, SUMMARY_CONCURRENCY
+)
+from app.services.metrics import llm_request_seconds, llm_first_token_seconds, llm_tokens, llm_token_rate
+
+# Receives each streamed token; returning True stops the generation early
+TokenCallback = Callable[[str], Optional[bool]]
+
+class LLMBackend(abc.ABC):
+    """Interface for text-generation backends used by summarization"""
+
+    name = "base"
+    model = ""
+
+    @abc.abstractmethod
+    async def generate(self, prompt: str, on_token: Optional[TokenCallback] = None) -> str:
+        """Return the completion for `prompt`, passing each streamed token to `on_token`"""
+
+    async def aclose(self):
+        pass
+
+class OllamaBackend(LLMBackend):
+    """Streams completions from Ollama's /api/generate over a keep-alive connection pool"""
+
+    name = "ollama"
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_URL,
+        model: str = OLLAMA_MODEL,
+        max_concurrency: int = SUMMARY_CONCURRENCY,
+        max_retries: int = OLLAMA_MAX_RETRIES,
+        timeout: float = OLLAMA_TIMEOUT
+    ):
+        self.base_url = base_url
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def generate(self, prompt: str, on_token: Optional[TokenCallback] = None) -> str:
+        client = self._ensure_client()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    return await self._stream(client, prompt, on_token)
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = not isinstance(e, httpx.HTTPStatusError) or e.response.status_code in (429, 500, 502, 503, 504)
+                if not retryable or attempt == self.max_retries:
+                    raise
+                delay = OLLAMA_RETRY_BACKOFF * (2 ** attempt) * (0.5 + random.random())
+                print(f"⚠️ Ollama request failed ({e!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _stream(self, client: httpx.AsyncClient, prompt: str, on_token: Optional[TokenCallback]) -> str:
+        parts = []
+        started = time.perf_counter()
+        first_token_at = None
+        # Ollama reports the generated token count (and time in ns) on its final message
+        token_count, eval_seconds = None, None
+        try:
+            async with client.stream(
+                "POST", "/api/generate",
+                json={"model": self.model, "prompt": prompt, "stream": True}
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if "error" in data:
+                        raise RuntimeError(f"Ollama error: {data['error']}")
+                    token = data.get("response", "")
+                    if token:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            llm_first_token_seconds.observe(first_token_at - started, backend=self.name)
+                        parts.append(token)
+                        if on_token and on_token(token):
+                            break
+                    if data.get("done"):
+                        token_count = data.get("eval_count")
+                        if data.get("eval_duration"):
+                            eval_seconds = data["eval_duration"] / 1e9
+                        break
+        except Exception:
+            llm_request_seconds.observe(time.perf_counter() - started, backend=self.name, outcome="error")
+            raise
+
+        finished = time.perf_counter()
+        llm_request_seconds.observe(finished - started, backend=self.name, outcome="ok")
+        # Streamed chunks are single tokens when Ollama doesn't report a count
+        token_count = token_count or len(parts)
+        llm_tokens.inc(token_count, backend=self.name)
+        if eval_seconds is None and first_token_at is not None:
+            eval_seconds = finished - first_token_at
+        if token_count > 1 and eval_seconds:
+            llm_token_rate.observe(token_count / eval_seconds, backend=self.name)
+        return "".join(parts)
+
+    async def aclose(self):
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+def _load_backend(spec: str) -> LLMBackend:
+    """Build a backend from `ollama` or a `package.module:ClassName` path"""
+    if spec == "ollama":
+        return OllamaBackend()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+# All requests run on one dedicated event loop so worker threads share a single connection pool
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_backend: Optional[LLMBackend] = None
+_lock = threading.Lock()
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-client", daemon=True).start()
+        return _loop
+
+def get_backend() -> LLMBackend:
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = _load_backend(LLM_BACKEND)
+        return _backend
+
+def set_backend(backend: LLMBackend):
+    """Swap the generation backend, e.g. for a stub in tests or benchmarks"""
+    global _backend
+    with _lock:
+        _backend = backend
+
+def generate(prompt: str, on_token: Optional[TokenCallback] = None) -> str:
+    """Blocking generate for worker threads; runs on the shared client loop"""
+    return asyncio.run_coroutine_threadsafe(get_backend().generate(prompt, on_token), _get_loop()).result()
+
+def shutdown():
+    global _loop
+    with _lock:
+        loop, _loop = _loop, None
+    if loop is None:
+        return
+    if _backend:
+        asyncio.run_coroutine_threadsafe(_backend.aclose(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
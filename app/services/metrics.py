@@ -0,0 +1,147 @@
+import math
+import threading
+from collections import defaultdict
+from typing import Callable
+
+# Upper bounds (seconds) for latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Upper bounds for Whisper real-time factor (processing seconds per audio second)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4)
+# Upper bounds for generation speed (tokens per second)
+TOKEN_RATE_BUCKETS = (1, 2.5, 5, 10, 20, 40, 80, 160)
+
+PREFIX = "meetscribe_"
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        self.name, self.description, self.labels = PREFIX + name, description, labels
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in sorted(values.items())]
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.description, self.labels = PREFIX + name, description, labels
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {bucket_count}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+class CallbackMetric:
+    """Value read from a callback at scrape time; the callback returns a number
+    or a {label value: number} dict for a single label"""
+
+    def __init__(self, name: str, description: str, read: Callable, label: str = "", kind: str = "gauge"):
+        self.name, self.description, self.read, self.label = PREFIX + name, description, read, label
+        self.kind = kind
+
+    def samples(self) -> list[str]:
+        try:
+            value = self.read()
+        except Exception as e:
+            print(f"⚠️ Could not read metric {self.name}: {e}")
+            return []
+        if isinstance(value, dict):
+            return [f"{self.name}{_labels((self.label,), (key,))} {_number(v)}" for key, v in sorted(value.items())]
+        return [f"{self.name} {_number(value)}"]
+
+_registry: dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+def register(metric):
+    """Add a metric to the /metrics output (re-registering a name replaces it)"""
+    with _registry_lock:
+        _registry[metric.name] = metric
+    return metric
+
+def gauge(name: str, description: str, read: Callable, label: str = "") -> CallbackMetric:
+    return register(CallbackMetric(name, description, read, label))
+
+def counter_from(name: str, description: str, read: Callable, label: str = "") -> CallbackMetric:
+    """Expose a count kept elsewhere (e.g. a collections.Counter) as a Prometheus counter"""
+    return register(CallbackMetric(name, description, read, label, kind="counter"))
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+stage_seconds = register(Histogram(
+    "stage_duration_seconds", "Time spent in each pipeline stage", ("stage",)
+))
+whisper_rtf = register(Histogram(
+    "whisper_realtime_factor", "Transcription wall time per second of audio", ("model",), RTF_BUCKETS
+))
+llm_request_seconds = register(Histogram(
+    "llm_request_duration_seconds", "Duration of LLM generation requests", ("backend", "outcome")
+))
+llm_first_token_seconds = register(Histogram(
+    "llm_first_token_seconds", "Time from sending a generation request to its first token", ("backend",)
+))
+llm_tokens = register(Counter(
+    "llm_generated_tokens_total", "Tokens generated by the LLM backend", ("backend",)
+))
+llm_token_rate = register(Histogram(
+    "llm_tokens_per_second", "Generation speed of completed LLM requests", ("backend",), TOKEN_RATE_BUCKETS
+))
+db_query_seconds = register(Histogram(
+    "db_query_duration_seconds", "Database statement execution time", ("engine", "statement")
+))
@@ -0,0 +1,47 @@
+from typing import Optional
+
+from app.config import (
+    WHISPER_PROFILE, WHISPER_PROFILE_MODELS, AUTO_FAST_MIN_SECONDS, AUTO_FAST_QUEUE_DEPTH, AUTO_ACCURATE_MAX_SECONDS
+)
+
+PROFILES = ("fast", "balanced", "accurate")
+PROFILE_CHOICES = PROFILES + ("auto",)
+
+# Extra whisper transcribe() options per profile; balanced keeps Whisper's defaults
+# (greedy decoding with temperature fallback)
+DECODE_OPTIONS = {
+    # One greedy pass per window: no temperature fallback retries, no conditioning on earlier text
+    "fast": {"temperature": 0.0, "condition_on_previous_text": False},
+    "balanced": {},
+    # Beam search at temperature 0, best-of-5 sampling on fallback
+    "accurate": {"beam_size": 5, "best_of": 5},
+}
+
+def _parse_models(spec: str) -> dict[str, str]:
+    models = {}
+    for entry in spec.split(","):
+        profile, _, model_size = entry.strip().partition(":")
+        if profile and model_size:
+            models[profile.strip()] = model_size.strip()
+    return models
+
+PROFILE_MODELS = _parse_models(WHISPER_PROFILE_MODELS)
+
+def profile_model(profile: Optional[str]) -> Optional[str]:
+    """Whisper model configured for a profile, if any"""
+    return PROFILE_MODELS.get(profile)
+
+def decode_options(profile: Optional[str]) -> dict:
+    return dict(DECODE_OPTIONS.get(profile, {}))
+
+def choose_profile(audio_seconds: Optional[float], queue_depth: int) -> str:
+    """Profile for `auto`, from the audio length (None if unknown) and the meetings already queued"""
+    if queue_depth >= AUTO_FAST_QUEUE_DEPTH or (audio_seconds or 0) >= AUTO_FAST_MIN_SECONDS:
+        return "fast"
+    if queue_depth == 0 and audio_seconds is not None and audio_seconds <= AUTO_ACCURATE_MAX_SECONDS:
+        return "accurate"
+    return "balanced"
+
+def requested_profile(profile: Optional[str]) -> str:
+    """The profile a request asked for, or WHISPER_PROFILE; may still be `auto`"""
+    return profile or WHISPER_PROFILE
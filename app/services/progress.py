@@ -0,0 +1,137 @@
+import asyncio
+import threading
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+
+from app.database import AsyncSessionLocal
+from app.models import Meeting
+from app.services.response_cache import response_cache
+
+# Statuses after which no further events are published for a task
+TERMINAL_STATUSES = ('completed', 'error')
+
+# Events buffered per subscriber; slow consumers lose the oldest first, which
+# is harmless because every event carries the full current state
+SUBSCRIBER_BUFFER = 64
+
+class Subscription:
+    """Async iterator over the progress events of one task (or all tasks)"""
+
+    def __init__(self, hub: "ProgressHub", task_id: Optional[str]):
+        self.hub = hub
+        self.task_id = task_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(SUBSCRIBER_BUFFER)
+
+    def _deliver(self, event: dict):
+        # Runs on the subscriber's event loop
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None if `timeout` seconds pass without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        return await self.queue.get()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+class ProgressHub:
+    """In-process pub/sub for pipeline progress.
+
+    Publishers are worker threads and the event loop; each subscriber gets
+    events on the loop it subscribed from. The latest event of every running
+    task is kept so late subscribers start from the current state.
+    """
+
+    def __init__(self):
+        self._subscribers: dict[Optional[str], set[Subscription]] = {}
+        self._latest: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, task_id: Optional[str] = None) -> Subscription:
+        """Subscribe to one task's events, or to every task's with None"""
+        subscription = Subscription(self, task_id)
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.task_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.task_id]
+
+    def latest(self, task_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._latest.get(task_id)
+
+    def publish(self, task_id: str, status: str, progress: Optional[float] = None, **extra):
+        """Publish a task's current stage and stage progress (0-100); safe from any thread"""
+        event = {
+            'type': 'progress',
+            'task_id': task_id,
+            'status': status,
+            'progress': round(progress, 1) if progress is not None else None,
+            **extra
+        }
+        # Published after the change is committed; a reprocessed meeting's cached responses are stale
+        response_cache.invalidate(task_id)
+        with self._lock:
+            if status in TERMINAL_STATUSES:
+                self._latest.pop(task_id, None)
+            else:
+                self._latest[task_id] = event
+            subscribers = list(self._subscribers.get(task_id, ())) + list(self._subscribers.get(None, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+hub = ProgressHub()
+
+async def status_payload(db: AsyncSession, task_id: str) -> Optional[dict]:
+    """Lightweight status of a meeting; transcript and summary only once it is completed"""
+    meeting = (await db.execute(
+        select(Meeting)
+        .options(load_only(*(getattr(Meeting, c) for c in Meeting.STATUS_COLUMNS)))
+        .where(Meeting.task_id == task_id)
+        .execution_options(populate_existing=True)
+    )).scalars().first()
+    if not meeting:
+        return None
+    
+    completed = meeting.status == 'completed'
+    if completed:
+        await db.refresh(meeting, ['transcript', 'summary_data'])
+    payload = {'type': 'status', **meeting.to_status_dict(include_results=completed)}
+    
+    latest = hub.latest(task_id)
+    if completed:
+        payload['progress'] = 100.0
+    elif latest and latest['status'] == meeting.status:
+        payload['progress'] = latest['progress']
+    else:
+        payload['progress'] = None
+    return payload
+
+async def final_payload(task_id: str) -> Optional[dict]:
+    """Status payload sent once a task reaches a terminal status"""
+    async with AsyncSessionLocal() as db:
+        return await status_payload(db, task_id)
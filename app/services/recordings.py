@@ -0,0 +1,90 @@
+import asyncio
+import json
+import struct
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Binary audio frame: [uint16 big-endian header length][JSON header][raw audio bytes]
+FRAME_HEADER_LENGTH = struct.Struct(">H")
+
+class SequenceGapError(Exception):
+    """Raised when a chunk arrives before the chunks preceding it"""
+
+    def __init__(self, expected_seq: int, received_seq: int):
+        super().__init__(f"Expected chunk {expected_seq}, received {received_seq}")
+        self.expected_seq = expected_seq
+        self.received_seq = received_seq
+
+def check_seq(seq) -> Optional[int]:
+    """Validate a chunk sequence number from a client (None lets the server assign it)"""
+    if seq is not None and (isinstance(seq, bool) or not isinstance(seq, int) or seq < 0):
+        raise ValueError(f"Invalid seq: {seq!r}")
+    return seq
+
+def parse_binary_frame(frame: bytes) -> tuple[dict, memoryview]:
+    """Split a binary frame into its JSON header and audio payload"""
+    view = memoryview(frame)
+    if len(view) < FRAME_HEADER_LENGTH.size:
+        raise ValueError("Frame too short")
+    (header_length,) = FRAME_HEADER_LENGTH.unpack_from(view)
+    header_end = FRAME_HEADER_LENGTH.size + header_length
+    if len(view) < header_end:
+        raise ValueError("Truncated frame header")
+    header = json.loads(bytes(view[FRAME_HEADER_LENGTH.size:header_end]))
+    if not isinstance(header, dict):
+        raise ValueError("Frame header must be a JSON object")
+    if not isinstance(header.get("session_id"), str):
+        raise ValueError("Frame header needs a session_id string")
+    check_seq(header.get("seq"))
+    return header, view[header_end:]
+
+def _append(filepath: str, data) -> None:
+    with open(filepath, 'ab') as f:
+        f.write(data)
+
+@dataclass
+class RecordingState:
+    filepath: str
+    next_seq: int = 0
+    bytes_received: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+class ChunkStore:
+    """Append-only, sequenced storage for live recordings.
+
+    State outlives the socket that created it, so a client that reconnects
+    can ask where to resume and re-send anything after `next_seq`.
+    """
+
+    def __init__(self):
+        self._recordings: dict[str, RecordingState] = {}
+
+    def open(self, session_id: str, filepath: str) -> RecordingState:
+        state = RecordingState(filepath)
+        self._recordings[session_id] = state
+        return state
+
+    def get(self, session_id: str) -> Optional[RecordingState]:
+        return self._recordings.get(session_id)
+
+    def close(self, session_id: str) -> Optional[RecordingState]:
+        return self._recordings.pop(session_id, None)
+
+    async def append(self, session_id: str, data, seq: Optional[int] = None) -> bool:
+        """Append a chunk off the event loop; returns False for an already-stored duplicate"""
+        state = self._recordings.get(session_id)
+        if state is None:
+            raise KeyError(session_id)
+        async with state.lock:
+            if seq is None:
+                seq = state.next_seq
+            if seq < state.next_seq:
+                return False
+            if seq > state.next_seq:
+                raise SequenceGapError(state.next_seq, seq)
+            await asyncio.to_thread(_append, state.filepath, data)
+            state.next_seq += 1
+            state.bytes_received += len(data)
+            return True
+
+chunk_store = ChunkStore()
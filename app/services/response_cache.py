@@ -0,0 +1,101 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import RESPONSE_CACHE_BYTES
+from app.services.metrics import Counter, register, gauge
+
+# Recently invalidated task ids remembered to reject stale writes; older ones fall back to a floor
+MAX_TRACKED_INVALIDATIONS = 4096
+
+response_cache_requests = register(Counter(
+    "response_cache_requests_total", "Cacheable read requests by result (hit, miss, not_modified)", ("result",)
+))
+
+def render_json(content) -> bytes:
+    """Serialize like FastAPI's JSONResponse"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+class ResponseCache:
+    """Size-bounded in-memory LRU of rendered response bodies and their ETags.
+
+    Only responses that can't change until something invalidates them
+    (completed meetings) belong here. Entries are keyed per endpoint and
+    dropped by task_id. Writes carry the generation read before the database
+    query, so a body built from rows that changed meanwhile is not stored.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[bytes, str, str]] = OrderedDict()
+        self._keys_by_task: dict[str, set[str]] = {}
+        self._generation = 0
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        """Take before reading from the database; pass to put()"""
+        return self._generation
+
+    def get(self, key: str) -> Optional[tuple[bytes, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def put(self, key: str, task_id: str, body: bytes, generation: int) -> str:
+        """Store a body unless its task was invalidated since `generation`; returns its ETag"""
+        etag = make_etag(body)
+        if len(body) > self.max_bytes:
+            return etag
+        with self._lock:
+            if generation < self._floor or self._invalidated.get(task_id, -1) > generation:
+                return etag
+            self._discard(key)
+            self._entries[key] = (body, etag, task_id)
+            self._keys_by_task.setdefault(task_id, set()).add(key)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+        return etag
+
+    def invalidate(self, task_id: str):
+        """Drop every cached response of a task; safe from any thread"""
+        with self._lock:
+            self._generation += 1
+            self._invalidated[task_id] = self._generation
+            self._invalidated.move_to_end(task_id)
+            if len(self._invalidated) > MAX_TRACKED_INVALIDATIONS:
+                _, self._floor = self._invalidated.popitem(last=False)
+            for key in list(self._keys_by_task.get(task_id, ())):
+                self._discard(key)
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= len(entry[0])
+        keys = self._keys_by_task.get(entry[2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_task[entry[2]]
+
+response_cache = ResponseCache(RESPONSE_CACHE_BYTES)
+
+gauge("response_cache_bytes", "Bytes of rendered responses held in memory", lambda: response_cache.size)
@@ -0,0 +1,106 @@
+import html
+import re
+from typing import Optional
+
+from sqlalchemy import text, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+
+from app.models import Meeting
+
+# External-content FTS5 index over meetings; triggers keep it in sync so a
+# meeting becomes searchable as soon as its transcript or summary is committed
+FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS meetings_fts USING fts5(
+        filename, transcript, summary_overview,
+        content='meetings', content_rowid='id',
+        tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS meetings_fts_insert AFTER INSERT ON meetings BEGIN
+        INSERT INTO meetings_fts(rowid, filename, transcript, summary_overview)
+        VALUES (new.id, new.filename, new.transcript, new.summary_overview);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS meetings_fts_delete AFTER DELETE ON meetings BEGIN
+        INSERT INTO meetings_fts(meetings_fts, rowid, filename, transcript, summary_overview)
+        VALUES ('delete', old.id, old.filename, old.transcript, old.summary_overview);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS meetings_fts_update
+    AFTER UPDATE OF filename, transcript, summary_overview ON meetings BEGIN
+        INSERT INTO meetings_fts(meetings_fts, rowid, filename, transcript, summary_overview)
+        VALUES ('delete', old.id, old.filename, old.transcript, old.summary_overview);
+        INSERT INTO meetings_fts(rowid, filename, transcript, summary_overview)
+        VALUES (new.id, new.filename, new.transcript, new.summary_overview);
+    END""",
+]
+
+# snippet() marks matches with these control characters; the text is HTML-escaped
+# in Python and only then are they turned into <mark> tags
+MARK_START, MARK_END = "\x02", "\x03"
+
+SEARCH_SQL = text("""
+    SELECT m.id, m.task_id, m.filename, m.status, m.created_at, m.recording_type,
+           bm25(meetings_fts, 2.0, 1.0, 4.0) AS rank,
+           snippet(meetings_fts, 1, char(2), char(3), '…', 16) AS transcript_snippet,
+           snippet(meetings_fts, 2, char(2), char(3), '…', 16) AS summary_snippet
+    FROM meetings_fts
+    JOIN meetings m ON m.id = meetings_fts.rowid
+    WHERE meetings_fts MATCH :query
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+""")
+
+def setup_search_index(engine: Engine):
+    """Create the FTS5 index and triggers, backfilling it the first time"""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meetings_fts'")
+        ).first()
+        for statement in FTS_SCHEMA:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text("INSERT INTO meetings_fts(meetings_fts) VALUES ('rebuild')"))
+            print("✅ Built meeting search index")
+
+def to_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, the last as a prefix"""
+    words = re.findall(r"\w+", query)
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """HTML-escape a snippet and wrap its matches in <mark>"""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+async def search_meetings(db: AsyncSession, query: str, limit: int = 20, offset: int = 0) -> list[dict]:
+    match = to_match_query(query)
+    if not match:
+        return []
+
+    if db.bind.dialect.name != "sqlite":
+        # No FTS5 outside SQLite: fall back to an unranked substring match
+        pattern = f"%{query}%"
+        meetings = (await db.execute(
+            select(Meeting)
+            .options(load_only(*(getattr(Meeting, c) for c in Meeting.LIST_COLUMNS)))
+            .where(or_(Meeting.transcript.ilike(pattern), Meeting.summary_overview.ilike(pattern),
+                       Meeting.filename.ilike(pattern)))
+            .order_by(Meeting.created_at.desc())
+            .offset(offset)
+            .limit(limit)
+        )).scalars().all()
+        return [dict(meeting.to_list_dict(), rank=None, transcript_snippet=None, summary_snippet=None)
+                for meeting in meetings]
+
+    rows = (await db.execute(SEARCH_SQL, {"query": match, "limit": limit, "offset": offset})).mappings().all()
+    return [
+        dict(row, transcript_snippet=highlight(row["transcript_snippet"]), summary_snippet=highlight(row["summary_snippet"]))
+        for row in rows
+    ]
@@ -0,0 +1,323 @@
+import os
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.config import (
+    STORAGE_TRANSCODE, OPUS_BITRATE, AUDIO_RETENTION_DAYS, AUDIO_QUOTA_BYTES,
+    STORAGE_SWEEP_SECONDS, ORPHAN_GRACE_SECONDS
+)
+from app.database import SessionLocal
+from app.models import Meeting
+from app.services.metrics import gauge
+from app.services.response_cache import response_cache
+
+UPLOAD_DIR = "uploads"
+TRANSCRIPT_DIR = "transcriptions"
+SUMMARY_DIR = "summaries"
+TEMP_DIR = "temp_recordings"
+ARTIFACT_DIRS = (UPLOAD_DIR, TRANSCRIPT_DIR, SUMMARY_DIR, TEMP_DIR)
+
+# Meetings whose audio is no longer needed by the pipeline
+FINISHED_STATUSES = ('completed', 'error')
+# Meetings transcoded per sweep, so one sweep can't hold the thread for hours
+COMPACT_BATCH = 50
+# Failed transcodes (ffmpeg missing, undecodable audio) before a recording is left as it is
+COMPACT_MAX_ATTEMPTS = 3
+
+def transcript_path(task_id: str) -> str:
+    return os.path.join(TRANSCRIPT_DIR, f"{task_id}_transcript.txt")
+
+def summary_path(task_id: str) -> str:
+    return os.path.join(SUMMARY_DIR, f"{task_id}_summary.json")
+
+def file_size(path: Optional[str]) -> int:
+    try:
+        return os.path.getsize(path) if path else 0
+    except OSError:
+        return 0
+
+def _remove(path: Optional[str]):
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Error deleting file {path}: {e}")
+
+def transcode_to_opus(source: str, target: str, bitrate: str = OPUS_BITRATE) -> bool:
+    """Re-encode a recording as mono Opus tuned for speech"""
+    try:
+        process = subprocess.run(
+            ["ffmpeg", "-nostdin", "-y", "-i", source, "-vn", "-ac", "1",
+             "-c:a", "libopus", "-b:a", bitrate, "-application", "voip", target],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+    except FileNotFoundError:
+        print("⚠️ ffmpeg not found; recordings are kept in their original format")
+        return False
+    if process.returncode != 0:
+        print(f"Transcoding failed for {source}: {process.stderr.decode(errors='replace')[-500:]}")
+        _remove(target)
+        return False
+    return True
+
+def delete_meeting_files(meeting: Meeting):
+    """Remove every file a meeting owns: recording, working copy, transcript and summary"""
+    for path in (meeting.file_path, meeting.audio_path, transcript_path(meeting.task_id), summary_path(meeting.task_id)):
+        _remove(path)
+
+def expire_audio(meeting: Meeting) -> int:
+    """Delete a meeting's audio but keep its transcript and summary; returns the bytes freed (caller commits)"""
+    freed = (meeting.file_bytes or 0) + (meeting.audio_bytes or 0)
+    _remove(meeting.file_path)
+    _remove(meeting.audio_path)
+    meeting.audio_path = None
+    meeting.file_bytes = 0
+    meeting.audio_bytes = 0
+    meeting.storage_tier = 'expired'
+    meeting.audio_expired_at = datetime.utcnow()
+    return freed
+
+class StorageManager:
+    """Background sweeper for on-disk artifacts.
+
+    Finished recordings are transcoded to Opus as soon as a meeting
+    completes; a periodic sweep also expires audio past its retention
+    period or beyond the quota (oldest first) and deletes files no meeting
+    refers to. Sizes are kept on each Meeting, so retention and quota
+    decisions come from the database rather than directory scans.
+    """
+
+    def __init__(
+        self,
+        interval: float = STORAGE_SWEEP_SECONDS,
+        retention_days: float = AUDIO_RETENTION_DAYS,
+        quota_bytes: int = AUDIO_QUOTA_BYTES,
+        transcode: bool = STORAGE_TRANSCODE,
+        orphan_grace: float = ORPHAN_GRACE_SECONDS
+    ):
+        self.interval = interval
+        self.retention_days = retention_days
+        self.quota_bytes = quota_bytes
+        self.transcode = transcode
+        self.orphan_grace = orphan_grace
+        # Bytes per artifact kind as of the last sweep
+        self.usage: dict[str, int] = {}
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="storage-sweeper", daemon=True)
+        self._thread.start()
+        print(f"✅ Storage sweeper started (every {self.interval:.0f}s)")
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def request_compaction(self):
+        """Transcode newly finished recordings without waiting for the next sweep"""
+        self._wake.set()
+
+    def _run(self):
+        next_sweep = time.monotonic()
+        while not self._stopping:
+            # Cleared before sweeping, so a request made mid-sweep triggers another pass
+            self._wake.clear()
+            full = time.monotonic() >= next_sweep
+            if full:
+                next_sweep = time.monotonic() + self.interval
+            try:
+                self.sweep(full)
+            except Exception as e:
+                print(f"Error in storage sweep: {str(e)}")
+                import traceback
+                traceback.print_exc()
+            self._wake.wait(max(0.0, next_sweep - time.monotonic()))
+
+    def sweep(self, full: bool = True):
+        db = SessionLocal()
+        try:
+            if self.transcode:
+                self.compact(db)
+            if full:
+                self.backfill_sizes(db)
+                self.expire(db)
+                self.enforce_quota(db)
+                self.collect_orphans(db)
+            self.usage = self.measure(db)
+        finally:
+            db.close()
+
+    def backfill_sizes(self, db: Session):
+        """Record sizes for meetings stored before sizes were tracked (a one-off stat per file)"""
+        meetings = db.query(Meeting).filter(Meeting.file_bytes.is_(None)).all()
+        for meeting in meetings:
+            meeting.file_bytes = file_size(meeting.file_path)
+            meeting.audio_bytes = file_size(meeting.audio_path)
+            meeting.transcript_bytes = file_size(transcript_path(meeting.task_id))
+            meeting.summary_bytes = file_size(summary_path(meeting.task_id))
+            meeting.storage_tier = meeting.storage_tier or 'original'
+        if meetings:
+            task_ids = [meeting.task_id for meeting in meetings]
+            db.commit()
+            self._invalidate(task_ids)
+
+    def compact(self, db: Session) -> int:
+        """Transcode completed recordings to Opus and drop their WAV working copies"""
+        meetings = (
+            db.query(Meeting)
+            .filter(Meeting.status == 'completed')
+            .filter(or_(Meeting.storage_tier.is_(None), Meeting.storage_tier == 'original'))
+            .filter(func.coalesce(Meeting.compact_attempts, 0) < COMPACT_MAX_ATTEMPTS)
+            .order_by(Meeting.completed_at.asc())
+            .limit(COMPACT_BATCH)
+            .all()
+        )
+        saved, compacted = 0, 0
+        for meeting in meetings:
+            task_id = meeting.task_id
+            saved += self._compact_meeting(meeting)
+            compacted += meeting.storage_tier == 'compact'
+            db.commit()
+            response_cache.invalidate(task_id)
+        if meetings:
+            print(f"🗜️ Compacted {compacted} of {len(meetings)} recording(s), saving {saved / 1024 ** 2:.1f} MB")
+        if len(meetings) == COMPACT_BATCH:
+            self._wake.set()
+        return saved
+
+    def _compact_meeting(self, meeting: Meeting) -> int:
+        """Drop the working copy and transcode the recording; the tier stays 'original' if the transcode fails"""
+        before = file_size(meeting.file_path) + file_size(meeting.audio_path)
+        _remove(meeting.audio_path)
+        meeting.audio_path = None
+        meeting.audio_bytes = 0
+
+        source = meeting.file_path
+        target = os.path.splitext(source)[0] + ".opus"
+        if not os.path.exists(source):
+            meeting.file_bytes = 0
+            meeting.storage_tier = 'compact'
+            return before
+        if source == target:
+            meeting.storage_tier = 'compact'
+        elif transcode_to_opus(source, target):
+            # Already-compressed uploads can come out larger; keep whichever is smaller
+            if file_size(target) < file_size(source):
+                _remove(source)
+                meeting.file_path = target
+            else:
+                _remove(target)
+            meeting.storage_tier = 'compact'
+        else:
+            meeting.compact_attempts = (meeting.compact_attempts or 0) + 1
+        meeting.file_bytes = file_size(meeting.file_path)
+        return before - meeting.file_bytes
+
+    def expire(self, db: Session) -> int:
+        """Delete the audio of meetings finished more than retention_days ago"""
+        if not self.retention_days:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        meetings = (
+            db.query(Meeting)
+            .filter(Meeting.status.in_(FINISHED_STATUSES))
+            .filter(or_(Meeting.storage_tier.is_(None), Meeting.storage_tier != 'expired'))
+            .filter(func.coalesce(Meeting.completed_at, Meeting.created_at) < cutoff)
+            .all()
+        )
+        freed = sum(expire_audio(meeting) for meeting in meetings)
+        task_ids = [meeting.task_id for meeting in meetings]
+        db.commit()
+        self._invalidate(task_ids)
+        if meetings:
+            print(f"🧹 Expired audio of {len(meetings)} meeting(s) past {self.retention_days:g} days, "
+                  f"freeing {freed / 1024 ** 2:.1f} MB")
+        return freed
+
+    def enforce_quota(self, db: Session) -> int:
+        """Expire the oldest finished meetings' audio until audio fits in quota_bytes"""
+        if not self.quota_bytes:
+            return 0
+        used = db.query(
+            func.coalesce(func.sum(func.coalesce(Meeting.file_bytes, 0) + func.coalesce(Meeting.audio_bytes, 0)), 0)
+        ).scalar()
+        if used <= self.quota_bytes:
+            return 0
+        candidates = (
+            db.query(Meeting)
+            .filter(Meeting.status.in_(FINISHED_STATUSES))
+            .filter(or_(Meeting.storage_tier.is_(None), Meeting.storage_tier != 'expired'))
+            .order_by(func.coalesce(Meeting.completed_at, Meeting.created_at).asc())
+            .yield_per(100)
+        )
+        freed, expired = 0, []
+        for meeting in candidates:
+            if used - freed <= self.quota_bytes:
+                break
+            freed += expire_audio(meeting)
+            expired.append(meeting.task_id)
+        db.commit()
+        self._invalidate(expired)
+        print(f"🧹 Expired audio of {len(expired)} meeting(s) to stay within the "
+              f"{self.quota_bytes / 1024 ** 2:.0f} MB quota, freeing {freed / 1024 ** 2:.1f} MB")
+        return freed
+
+    def _invalidate(self, task_ids: list[str]):
+        """Drop cached responses of meetings whose storage fields just changed"""
+        for task_id in task_ids:
+            response_cache.invalidate(task_id)
+
+    def collect_orphans(self, db: Session) -> int:
+        """Delete files in the artifact directories that no meeting refers to"""
+        referenced = set()
+        for task_id, file_path, audio_path in db.query(Meeting.task_id, Meeting.file_path, Meeting.audio_path):
+            referenced.update(os.path.normpath(path) for path in (file_path, audio_path) if path)
+            referenced.add(os.path.normpath(transcript_path(task_id)))
+            referenced.add(os.path.normpath(summary_path(task_id)))
+
+        cutoff = time.time() - self.orphan_grace
+        removed, freed = 0, 0
+        for directory in ARTIFACT_DIRS:
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if not entry.is_file() or os.path.normpath(entry.path) in referenced:
+                    continue
+                stat = entry.stat()
+                if stat.st_mtime > cutoff:
+                    continue
+                _remove(entry.path)
+                removed += 1
+                freed += stat.st_size
+        if removed:
+            print(f"🧹 Removed {removed} orphaned file(s), freeing {freed / 1024 ** 2:.1f} MB")
+        return freed
+
+    def measure(self, db: Session) -> dict[str, int]:
+        totals = db.query(
+            func.sum(Meeting.file_bytes), func.sum(Meeting.audio_bytes),
+            func.sum(Meeting.transcript_bytes), func.sum(Meeting.summary_bytes)
+        ).one()
+        return {kind: int(total or 0) for kind, total in zip(('recording', 'working_audio', 'transcript', 'summary'), totals)}
+
+storage = StorageManager()
+
+gauge("storage_bytes", "Bytes on disk per artifact kind, as of the last storage sweep",
+      lambda: storage.usage, label="kind")
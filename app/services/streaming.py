@@ -0,0 +1,147 @@
+import asyncio
+import re
+import time
+from typing import Awaitable, Callable, Optional
+
+from app.config import LIVE_PASS_INTERVAL_SECONDS, LIVE_OVERLAP_SECONDS
+from app.services.whisper_engine import get_engine
+
+# Words compared when de-duplicating text across overlapping windows
+MAX_OVERLAP_WORDS = 12
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+def merge_overlap(previous: list[str], incoming: list[str], max_words: int = MAX_OVERLAP_WORDS) -> list[str]:
+    """Drop the leading words of `incoming` that repeat the tail of `previous`"""
+    tail = [_normalize(w) for w in previous[-max_words:]]
+    head = [_normalize(w) for w in incoming[:max_words]]
+    for n in range(min(len(tail), len(head)), 0, -1):
+        if tail[-n:] == head[:n]:
+            return incoming[n:]
+    return incoming
+
+def merge_segments(previous: list[str], segments: list[dict], floor: float = 0.0) -> tuple[list[dict], list[str]]:
+    """Drop leading words of `segments` that repeat the tail of `previous`.
+
+    Returns the kept segments (a trimmed segment starts no earlier than
+    `floor`) and their words.
+    """
+    segment_words = [w for seg in segments for w in seg["text"].split()]
+    new_words = merge_overlap(previous, segment_words)
+
+    dropped = len(segment_words) - len(new_words)
+    kept = []
+    for segment in segments:
+        words = segment["text"].split()
+        if dropped >= len(words):
+            dropped -= len(words)
+            continue
+        if dropped:
+            segment = dict(segment, text=" ".join(words[dropped:]), start=max(segment["start"], floor))
+            dropped = 0
+        kept.append(segment)
+    return kept, new_words
+
+class LiveTranscriber:
+    """Incrementally transcribes a recording while its audio is still arriving.
+
+    Each pass re-decodes from `LIVE_OVERLAP_SECONDS` before the committed point
+    to the end of the file. Segments ending inside the final overlap are held
+    back until the next pass, and repeated boundary words are dropped.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        filepath: str,
+        on_partial: Optional[Callable[[dict], Awaitable[None]]] = None,
+        model_size: Optional[str] = None,
+        decode_options: Optional[dict] = None
+    ):
+        self.session_id = session_id
+        self.filepath = filepath
+        self.on_partial = on_partial
+        self.model_size = model_size
+        self.decode_options = decode_options or {}
+        # Worker time spent on passes, overlaps included
+        self.decode_seconds = 0.0
+        self.committed_until = 0.0
+        self.words: list[str] = []
+        self.segments: list[dict] = []
+        self._pass: Optional[asyncio.Task] = None
+        self._last_pass = time.monotonic()
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(self.words)
+
+    @property
+    def realtime_factor(self) -> Optional[float]:
+        """Decode time per second of committed audio"""
+        return self.decode_seconds / self.committed_until if self.committed_until else None
+
+    def notify_audio(self):
+        """Start a background pass if one is due and none is running"""
+        if self._pass and not self._pass.done():
+            return
+        if time.monotonic() - self._last_pass < LIVE_PASS_INTERVAL_SECONDS:
+            return
+        self._pass = asyncio.create_task(self._run_pass(final=False))
+
+    async def finish(self) -> str:
+        """Wait for any running pass, then transcribe the remaining tail"""
+        if self._pass:
+            await asyncio.gather(self._pass, return_exceptions=True)
+        await self._run_pass(final=True)
+        return self.transcript
+
+    async def _run_pass(self, final: bool):
+        self._last_pass = time.monotonic()
+        start = max(0.0, self.committed_until - LIVE_OVERLAP_SECONDS)
+        options = dict(self.decode_options)
+        if self.words:
+            options["initial_prompt"] = " ".join(self.words[-50:])
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wrap_future(
+                get_engine(self.model_size).submit_window(self.filepath, start, **options)
+            )
+        except Exception as e:
+            print(f"Live transcription pass failed for {self.session_id}: {str(e)}")
+            if final:
+                raise
+            return
+        finally:
+            self.decode_seconds += time.perf_counter() - started
+
+        cutoff = result["end"] if final else result["end"] - LIVE_OVERLAP_SECONDS
+        new_segments = []
+        committed_until = self.committed_until
+        for segment in result["segments"]:
+            if segment["end"] <= self.committed_until:
+                continue
+            if segment["end"] > cutoff:
+                break
+            new_segments.append(segment)
+            committed_until = segment["end"]
+        if not new_segments and not final:
+            # Nothing to commit (silence): skip ahead to the first pending segment or the
+            # cutoff, so later windows don't keep growing from the same point
+            pending = [segment["start"] for segment in result["segments"] if segment["end"] > self.committed_until]
+            committed_until = min(pending + [cutoff])
+
+        # Trim the repeated boundary words from the stored segments as well
+        kept, new_words = merge_segments(self.words, new_segments, self.committed_until)
+        self.segments.extend(kept)
+        self.words.extend(new_words)
+        self.committed_until = max(committed_until, self.committed_until)
+
+        if new_words and self.on_partial:
+            await self.on_partial({
+                "type": "partial_transcript",
+                "session_id": self.session_id,
+                "text": " ".join(new_words),
+                "transcript": self.transcript,
+                "until": self.committed_until
+            })
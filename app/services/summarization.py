@@ -1,16 +1,18 @@
-import requests
 import json
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 
-def summarize_transcript(transcript: str) -> dict:
-    """Use Ollama with Llama3 to summarize transcript"""
-    try:
-        prompt = f"""Analyze this meeting transcript and provide a structured summary in JSON format.
+from app.config import SUMMARY_CHUNK_TOKENS, SUMMARY_CONCURRENCY
+from app.services.cache import ArtifactCache, summary_cache, sha256_text
+from app.services.llm import generate, get_backend
+from app.services.summary_parser import JSONObjectExtractor, parse_summary, record
 
-Transcript:
-{transcript}
+# Bump whenever the prompt changes so cached summaries are not reused
+PROMPT_VERSION = "1"
 
-Please provide a JSON response with exactly these fields:
+SUMMARY_FORMAT = """Please provide a JSON response with exactly these fields:
 1. "overview": A brief 2-3 sentence summary of the meeting
 2. "key_points": An array of the main discussion points (3-6 items)
 3. "action_items": An array of tasks or actions mentioned (if any)
@@ -18,46 +20,168 @@ Please provide a JSON response with exactly these fields:
 
 IMPORTANT: Return ONLY the raw JSON object. Do not include any markdown formatting, code blocks, or explanatory text before or after the JSON."""
 
-        response = requests.post(
-            'http://localhost:11434/api/generate',
-            json={
-                "model": "llama3",
-                "prompt": prompt,
-                "stream": False
-            },
-            timeout=120
-        )
+def summary_cache_key(transcript: str) -> str:
+    return ArtifactCache.key(sha256_text(transcript), PROMPT_VERSION, get_backend().model)
+
+def _remember(transcript: str, summary: dict) -> dict:
+    summary_cache.put(summary_cache_key(transcript), json.dumps(summary, indent=2))
+    return summary
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+def split_transcript(transcript: str, max_tokens: int = SUMMARY_CHUNK_TOKENS) -> list[str]:
+    """Split a transcript into chunks of at most `max_tokens`, on sentence boundaries"""
+    pieces = []
+    for sentence in re.split(r'(?<=[.!?])\s+', transcript.strip()):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        # A run-on sentence longer than a whole chunk: fall back to word boundaries
+        words = sentence.split()
+        step = max(1, max_tokens * 4 // 6)
+        pieces.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+    
+    chunks, current, current_tokens = [], [], 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks or [transcript]
+
+def _reask_prompt(response: str) -> str:
+    return f"""The text below was supposed to be a meeting summary as a single JSON object, but it could not be parsed.
+
+{response}
+
+Rewrite it as valid JSON. {SUMMARY_FORMAT}"""
+
+def _generate_summary(prompt: str) -> Optional[dict]:
+    """Generate and parse a summary, re-asking once with just the bad output if unparseable"""
+    extractor = JSONObjectExtractor()
+    
+    def consume(token: str) -> bool:
+        # Stop generating once the first complete object has arrived
+        return extractor.feed(token) is not None
+    
+    response = generate(prompt, consume)
+    summary = parse_summary(response)
+    if summary is not None:
+        return summary
+    
+    print(f"Unparseable summary response, re-asking: {response[:500]}")
+    record('reask')
+    return parse_summary(generate(_reask_prompt(response)))
+
+def _transcript_prompt(transcript: str) -> str:
+    return f"""Analyze this meeting transcript and provide a structured summary in JSON format.
+
+Transcript:
+{transcript}
+
+{SUMMARY_FORMAT}"""
+
+def _chunk_prompt(index: int, total: int, chunk: str) -> str:
+    return f"""Analyze part {index + 1} of {total} of a meeting transcript and provide a structured summary of this part in JSON format.
+
+Transcript part:
+{chunk}
+
+{SUMMARY_FORMAT}"""
+
+def _merge_prompt(partials: list[str]) -> str:
+    parts = "\n\n".join(f"Part {i + 1}:\n{partial}" for i, partial in enumerate(partials))
+    return f"""Below are JSON summaries of consecutive parts of one meeting. Merge them into a single structured summary of the whole meeting in JSON format, combining duplicate points.
+
+{parts}
+
+{SUMMARY_FORMAT}"""
+
+def _summarize_cached(kind: str, text: str, prompt: str) -> dict:
+    """Summarize one map/reduce unit, reusing a cached result for identical input"""
+    key = ArtifactCache.key(sha256_text(text), PROMPT_VERSION, get_backend().model, kind)
+    cached = summary_cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    summary = _generate_summary(prompt)
+    if summary is None:
+        raise ValueError(f"Could not parse {kind} summary")
+    summary_cache.put(key, json.dumps(summary, indent=2))
+    return summary
+
+def _reduce(partials: list[dict], pool: ThreadPoolExecutor) -> dict:
+    """Merge partial summaries, in token-bounded groups, until one remains"""
+    while len(partials) > 1:
+        groups, current, current_tokens = [], [], 0
+        for partial in (json.dumps(p) for p in partials):
+            tokens = estimate_tokens(partial)
+            if len(current) >= 2 and current_tokens + tokens > SUMMARY_CHUNK_TOKENS:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(partial)
+            current_tokens += tokens
+        groups.append(current)
         
-        result = response.json()['response']
+        partials = list(pool.map(
+            lambda group: json.loads(group[0]) if len(group) == 1
+            else _summarize_cached("merge", "\n".join(group), _merge_prompt(group)),
+            groups
+        ))
+    return partials[0]
+
+# Share of chunked-summary progress reported once every chunk is summarized;
+# the rest is the merge step
+MAP_PROGRESS = 90.0
+
+def summarize_transcript(
+    transcript: str,
+    on_progress: Optional[Callable[[float], None]] = None
+) -> dict:
+    """Use Ollama with Llama3 to summarize transcript
+
+    Transcripts longer than SUMMARY_CHUNK_TOKENS are summarized chunk by
+    chunk and the partial summaries merged; chunk results are cached so a
+    retry only regenerates the chunks that failed. `on_progress` receives
+    the percentage of chunks summarized.
+    """
+    cached = summary_cache.get(summary_cache_key(transcript))
+    if cached is not None:
+        print("♻️ Reusing cached summary")
+        return json.loads(cached)
+    
+    try:
+        chunks = split_transcript(transcript)
         
-        try:
-            # Clean up markdown code blocks if present
-            if '```json' in result:
-                result = result.split('```json').split('```').strip()[1]
-            elif '```' in result:
-                result = result.split('```').split('```')[0].strip()
-            
-            summary = json.loads(result)
-            
-            # Validate required fields
-            if not all(k in summary for k in ['overview', 'key_points', 'action_items', 'decisions']):
-                raise ValueError("Missing required fields")
+        if len(chunks) == 1:
+            summary = _generate_summary(_transcript_prompt(transcript))
+        else:
+            print(f"Summarizing transcript in {len(chunks)} chunks")
+            done = 0
+            done_lock = threading.Lock()
             
-            return summary
+            def summarize_chunk(item):
+                nonlocal done
+                index, chunk = item
+                partial = _summarize_cached(
+                    f"chunk {index + 1}/{len(chunks)}", chunk, _chunk_prompt(index, len(chunks), chunk)
+                )
+                if on_progress:
+                    with done_lock:
+                        done += 1
+                        on_progress(MAP_PROGRESS * done / len(chunks))
+                return partial
             
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"JSON parse error: {e}")
-            print(f"Raw response: {result}")
-            
-            # Try to extract JSON using regex
-            try:
-                json_match = re.search(r'\{[\s\S]*\}', result)
-                if json_match:
-                    summary = json.loads(json_match.group())
-                    return summary
-            except:
-                pass
-
+            with ThreadPoolExecutor(max_workers=SUMMARY_CONCURRENCY) as pool:
+                partials = list(pool.map(summarize_chunk, enumerate(chunks)))
+                summary = _reduce(partials, pool)
+        
+        if summary is None:
             # Fallback to basic structure
             return {
                 'overview': 'See full transcript for details',
@@ -65,6 +189,8 @@ IMPORTANT: Return ONLY the raw JSON object. Do not include any markdown formatti
                 'action_items': [],
                 'decisions': []
             }
+        
+        return _remember(transcript, summary)
                 
     except Exception as e:
         print(f"Summarization error: {str(e)}")
@@ -0,0 +1,176 @@
+import json
+import re
+import threading
+from collections import Counter
+from typing import Optional
+
+from pydantic import ValidationError
+
+from app.schemas import SummaryData
+from app.services.metrics import counter_from
+
+LIST_FIELDS = ('key_points', 'action_items', 'decisions')
+
+# How often each parse path is taken: direct, extracted, repaired, reask, failed
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+def record(path: str):
+    with _metrics_lock:
+        _metrics[path] += 1
+
+def get_parse_metrics() -> dict:
+    with _metrics_lock:
+        return dict(_metrics)
+
+counter_from("summary_parse_total", "Summary responses by the parse path that produced them", get_parse_metrics, label="path")
+
+class JSONObjectExtractor:
+    """Finds the first balanced {...} object in text fed piece by piece.
+
+    Braces inside single- or double-quoted strings are ignored, so prose or
+    markdown fences around the object don't matter.
+    """
+
+    def __init__(self):
+        self.result: Optional[str] = None
+        self._buffer: list[str] = []
+        self._depth = 0
+        self._quote: Optional[str] = None
+        self._escaped = False
+
+    def feed(self, text: str) -> Optional[str]:
+        """Consume more text; returns the object once it is complete"""
+        if self.result is not None:
+            return self.result
+        for i, char in enumerate(text):
+            if self._depth == 0:
+                if char != '{':
+                    continue
+            elif self._quote:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == self._quote:
+                    self._quote = None
+            elif char in ('"', "'"):
+                self._quote = char
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._buffer.append(char)
+                    self.result = "".join(self._buffer)
+                    return self.result
+
+            if char == '{' and self._depth == 0:
+                self._depth = 1
+            self._buffer.append(char)
+        return None
+
+def extract_json_object(text: str) -> Optional[str]:
+    return JSONObjectExtractor().feed(text)
+
+_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+def repair_json(text: str) -> str:
+    """Fix common LLM JSON defects: single quotes, Python literals, trailing commas"""
+    out = []
+    quote = None
+    comma = None  # index in `out` of a comma followed only by whitespace so far
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if quote:
+            if char == '\\' and i + 1 < len(text):
+                nxt = text[i + 1]
+                # \' is not a valid JSON escape
+                out.append(nxt if nxt == "'" else char + nxt)
+                i += 2
+                continue
+            if char == quote:
+                out.append('"')
+                quote = None
+            elif char == '"':
+                out.append('\\"')
+            elif char == '\n':
+                out.append('\\n')
+            else:
+                out.append(char)
+        elif char in ('"', "'"):
+            out.append('"')
+            quote = char
+            comma = None
+        else:
+            match = re.match(r'True|False|None', text[i:])
+            if match and not (i and text[i - 1].isalnum()):
+                out.append(_LITERALS[match.group()])
+                i += len(match.group())
+                comma = None
+                continue
+            if char in '}]' and comma is not None:
+                # Trailing comma before a closing bracket
+                del out[comma]
+            if char == ',':
+                comma = len(out)
+            elif not char.isspace():
+                comma = None
+            out.append(char)
+        i += 1
+    return "".join(out)
+
+def _as_text(item) -> str:
+    if isinstance(item, dict):
+        return ": ".join(str(v) for v in item.values() if v)
+    return str(item)
+
+def coerce_summary(data) -> tuple[Optional[dict], bool]:
+    """Validate against SummaryData, filling defects; returns (summary, was_repaired)"""
+    if not isinstance(data, dict) or not isinstance(data.get('overview'), str):
+        return None, False
+    repaired = False
+    fields = {'overview': data['overview'].strip()}
+    for field in LIST_FIELDS:
+        value = data.get(field)
+        if value is None:
+            value, repaired = [], True
+        elif isinstance(value, str):
+            value, repaired = ([value] if value.strip() else []), True
+        elif not isinstance(value, list):
+            return None, False
+        if any(not isinstance(item, str) for item in value):
+            value, repaired = [_as_text(item) for item in value], True
+        fields[field] = value
+    try:
+        return SummaryData(**fields).model_dump(), repaired
+    except ValidationError:
+        return None, False
+
+def parse_summary(text: str) -> Optional[dict]:
+    """Parse an LLM response into SummaryData fields, or None if unrecoverable"""
+    candidates = [('direct', text.strip())]
+    extracted = extract_json_object(text)
+    if extracted and extracted != text.strip():
+        candidates.append(('extracted', extracted))
+
+    for path, candidate in candidates:
+        try:
+            summary, repaired = coerce_summary(json.loads(candidate))
+        except json.JSONDecodeError:
+            continue
+        if summary is not None:
+            record('repaired' if repaired else path)
+            return summary
+
+    try:
+        summary, _ = coerce_summary(json.loads(repair_json(extracted or text)))
+    except json.JSONDecodeError:
+        summary = None
+    if summary is not None:
+        record('repaired')
+        return summary
+
+    record('failed')
+    return None
@@ -0,0 +1,102 @@
+import asyncio
+import functools
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from app.config import TRACE_JOBS
+from app.services.metrics import stage_seconds
+
+# Most recent durations kept per stage for percentiles
+MAX_SAMPLES = 1000
+
+_durations: dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+_counts: dict[str, int] = defaultdict(int)
+_totals: dict[str, float] = defaultdict(float)
+_lock = threading.Lock()
+
+# Spans of the job being traced in the current thread or task, if any
+_trace: ContextVar[Optional[list]] = ContextVar("trace", default=None)
+
+def record_duration(stage: str, seconds: float):
+    with _lock:
+        _durations[stage].append(seconds)
+        _counts[stage] += 1
+        _totals[stage] += seconds
+    stage_seconds.observe(seconds, stage=stage)
+
+@contextmanager
+def timed(stage: str):
+    """Record how long the block takes under `stage` (also when it raises),
+    and add it as a span to the active trace"""
+    started_at = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        record_duration(stage, seconds)
+        spans = _trace.get()
+        if spans is not None:
+            spans.append({'name': stage, 'start': round(started_at, 3), 'duration_ms': round(1000 * seconds, 2)})
+
+@contextmanager
+def tracing(enabled: bool = True):
+    """Collect the spans timed inside the block; yields the span list (None when disabled)"""
+    if not enabled:
+        yield None
+        return
+    spans = []
+    token = _trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _trace.reset(token)
+
+def current_spans() -> Optional[list]:
+    """Spans recorded so far by the active trace, or None outside one"""
+    return _trace.get()
+
+def traced(func):
+    """Give each call of a (sync or async) job function its own trace when TRACE_JOBS is on"""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def run_async(*args, **kwargs):
+            with tracing(TRACE_JOBS):
+                return await func(*args, **kwargs)
+        return run_async
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        with tracing(TRACE_JOBS):
+            return func(*args, **kwargs)
+    return run
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def get_stage_timings() -> dict[str, dict]:
+    """Per-stage count, total and latency percentiles (ms) of the recent samples"""
+    with _lock:
+        snapshot = {stage: (sorted(samples), _counts[stage], _totals[stage]) for stage, samples in _durations.items()}
+    return {
+        stage: {
+            'count': count,
+            'total_s': round(total, 4),
+            'mean_ms': round(1000 * sum(ordered) / len(ordered), 2),
+            'p50_ms': round(1000 * _percentile(ordered, 0.5), 2),
+            'p95_ms': round(1000 * _percentile(ordered, 0.95), 2),
+            'max_ms': round(1000 * ordered[-1], 2)
+        }
+        for stage, (ordered, count, total) in snapshot.items()
+        if ordered
+    }
+
+def reset_stage_timings():
+    with _lock:
+        _durations.clear()
+        _counts.clear()
+        _totals.clear()
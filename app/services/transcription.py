@@ -1,125 +1,301 @@
-import whisper
 import os
+import time
+import asyncio
+from concurrent.futures import Future
 from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
-from app.models import Meeting
-from app.services.summarization import summarize_transcript
+from app.database import AsyncSessionLocal
+from app.models import Meeting, TranscriptSegment
+from app.config import (
+    WHISPER_MODEL, WHISPER_UPLOAD_MODEL, WHISPER_LIVE_MODEL, VAD_ENABLED, VAD_THRESHOLD_DB, VAD_MIN_SILENCE_SECONDS,
+    VAD_MIN_SPEECH_SECONDS, VAD_PAD_SECONDS, VAD_BATCH_SECONDS,
+    TRANSCRIBE_CHUNK_SECONDS, TRANSCRIBE_CHUNK_OVERLAP_SECONDS, TRANSCRIBE_PARALLEL_CHUNKS
+)
+from app.services.summarization import summarize_transcript, summary_cache_key
+from app.services.whisper_engine import get_engine
+from app.services.cache import ArtifactCache, transcript_cache, segment_cache, summary_cache, sha256_file
+from app.services.progress import hub
+from app.services.timing import timed, traced, current_spans
+from app.services.metrics import whisper_rtf
+from app.services.storage import storage, transcript_path, summary_path, file_size
+from app.services.profiles import decode_options
+from app.services.uploads import extract_audio_blocking
 import json
 
-# Load Whisper model once at startup
-print("Loading Whisper model... This may take a moment.")
-whisper_model = whisper.load_model("base")
-print("✅ Whisper model loaded successfully!")
+# Speech detection run before Whisper, so silence is neither decoded nor hallucinated over
+VAD_OPTIONS = {
+    'threshold_db': VAD_THRESHOLD_DB,
+    'min_silence': VAD_MIN_SILENCE_SECONDS,
+    'min_speech': VAD_MIN_SPEECH_SECONDS,
+    'pad': VAD_PAD_SECONDS,
+    'batch_seconds': VAD_BATCH_SECONDS
+} if VAD_ENABLED else None
 
-def transcribe_audio(filepath: str) -> str:
-    """Use local Whisper to transcribe audio"""
-    try:
-        print(f"Transcribing {filepath} with Whisper...")
-        result = whisper_model.transcribe(filepath)
-        return result["text"]
-    except Exception as e:
-        print(f"Transcription error: {str(e)}")
-        raise
+def transcription_options(profile: Optional[str] = None) -> dict:
+    """Settings that change the transcript, and so belong in its cache key"""
+    options = {}
+    if decode_options(profile):
+        options['decode'] = decode_options(profile)
+    if VAD_OPTIONS:
+        options['vad'] = VAD_OPTIONS
+    if TRANSCRIBE_CHUNK_SECONDS > 0:
+        options['chunk'] = [TRANSCRIBE_CHUNK_SECONDS, TRANSCRIBE_CHUNK_OVERLAP_SECONDS]
+    return options
 
-def process_audio_file(filepath: str, task_id: str, db: Session):
-    """Process uploaded audio file: transcribe and summarize"""
+def transcript_cache_key(content_hash: str, model_size: Optional[str] = None, options: Optional[dict] = None) -> str:
+    if options is None:
+        options = transcription_options()
+    return ArtifactCache.key(content_hash, model_size or WHISPER_MODEL, json.dumps(options, sort_keys=True))
+
+def transcribe_audio(filepath: str, model_size: Optional[str] = None, on_progress=None, profile: Optional[str] = None) -> Future:
+    """Queue audio on a Whisper worker pool; the future resolves to {text, segments}
+    (plus audio_seconds and speech_seconds when VAD is enabled)"""
+    print(f"Transcribing {filepath} with Whisper...")
+    engine = get_engine(model_size)
+    options = decode_options(profile)
+    if TRANSCRIBE_CHUNK_SECONDS > 0 and engine.workers > 1:
+        return engine.submit_chunked(
+            filepath, TRANSCRIBE_CHUNK_SECONDS, TRANSCRIBE_CHUNK_OVERLAP_SECONDS,
+            on_progress=on_progress, vad=VAD_OPTIONS, max_parallel=TRANSCRIBE_PARALLEL_CHUNKS or None, **options
+        )
+    return engine.submit(filepath, on_progress=on_progress, vad=VAD_OPTIONS, **options)
+
+def _record_skipped(meeting: Meeting, result: dict):
+    """Store how much silence VAD kept away from Whisper"""
+    if result.get('audio_seconds') is None:
+        return
+    meeting.audio_seconds = result['audio_seconds']
+    meeting.skipped_seconds = max(0.0, result['audio_seconds'] - result['speech_seconds'])
+    if meeting.audio_seconds:
+        print(f"🔇 Skipped {meeting.skipped_seconds:.1f}s of {meeting.audio_seconds:.1f}s as silence "
+              f"({100 * meeting.skipped_seconds / meeting.audio_seconds:.0f}%)")
+
+def _record_rtf(model_size: str, seconds: float, result: dict) -> Optional[float]:
+    """Observe transcription wall time per second of audio; returns it (None for empty audio)"""
+    segments = result['segments']
+    audio_seconds = result.get('audio_seconds') or (segments[-1]['end'] if segments else 0)
+    if not audio_seconds:
+        return None
+    whisper_rtf.observe(seconds / audio_seconds, model=model_size)
+    return seconds / audio_seconds
+
+def meeting_model(meeting: Meeting) -> str:
+    """Whisper model chosen for a meeting, or the default for its recording type"""
+    if meeting.whisper_model:
+        return meeting.whisper_model
+    return WHISPER_LIVE_MODEL if meeting.recording_type == 'live' else WHISPER_UPLOAD_MODEL
+
+def _stage_progress(task_id: str, status: str):
+    return lambda percent: hub.publish(task_id, status, percent)
+
+def _write_transcript(transcript_file: str, transcript: str):
+    os.makedirs(os.path.dirname(transcript_file), exist_ok=True)
+    with open(transcript_file, 'w') as f:
+        f.write(transcript)
+
+def _extract_batch_audio(meeting: Meeting, db: Session) -> str:
+    """Normalize a batch import to 16 kHz mono, as /upload does before queueing; returns the path to decode"""
+    audio_path = os.path.splitext(meeting.file_path)[0] + "_16k.wav"
+    with timed('decode'):
+        if not extract_audio_blocking(meeting.file_path, audio_path):
+            return meeting.file_path
+    meeting.audio_path = audio_path
+    meeting.audio_bytes = file_size(audio_path)
+    db.commit()
+    return audio_path
+
+def store_segments(db: Session, meeting: Meeting, segments: list[dict]):
+    """Replace a meeting's transcript segments (caller commits)"""
+    db.query(TranscriptSegment).filter(TranscriptSegment.meeting_id == meeting.id).delete()
+    if segments:
+        db.execute(insert(TranscriptSegment), [
+            {
+                'meeting_id': meeting.id,
+                'start': segment['start'],
+                'end': segment['end'],
+                'text': segment['text'],
+                'avg_logprob': segment.get('avg_logprob')
+            }
+            for segment in segments
+        ])
+
+@traced
+def transcribe_meeting(task_id: str, db: Session) -> bool:
+    """Transcription stage: transcribe the meeting's audio and store the transcript"""
     try:
-        # Update status to transcribing
         meeting = db.query(Meeting).filter(Meeting.task_id == task_id).first()
         if not meeting:
             print(f"Meeting with task_id {task_id} not found")
-            return
+            return False
         
+        filepath = meeting.audio_path or meeting.file_path
         meeting.status = 'transcribing'
         db.commit()
+        hub.publish(task_id, 'transcribing', 0)
+        
+        model_size = meeting_model(meeting)
+        content_hash = meeting.content_hash or sha256_file(meeting.file_path)
+        cache_key = transcript_cache_key(content_hash, model_size, transcription_options(meeting.profile))
         
-        # Transcribe
-        print(f"Starting transcription for {filepath}")
-        transcript = transcribe_audio(filepath)
+        # Transcribe, unless this exact audio was transcribed before
+        transcript = transcript_cache.get(cache_key)
+        cached_segments = segment_cache.get(cache_key)
+        if transcript is not None and cached_segments is not None:
+            print(f"♻️ Reusing cached transcript for {filepath}")
+            result = json.loads(cached_segments)
+            # Entries cached before VAD hold only the segment list
+            if isinstance(result, list):
+                result = {'segments': result}
+        else:
+            if meeting.batch_id and not meeting.audio_path:
+                # Batch imports are stored as they arrive; decode the container here, on the worker
+                filepath = _extract_batch_audio(meeting, db)
+            print(f"Starting transcription for {filepath} ({meeting.profile or 'balanced'} profile)")
+            started = time.perf_counter()
+            with timed('transcribe'):
+                result = transcribe_audio(
+                    filepath, model_size, on_progress=_stage_progress(task_id, 'transcribing'), profile=meeting.profile
+                ).result()
+            meeting.realtime_factor = _record_rtf(model_size, time.perf_counter() - started, result)
+            transcript = result.pop('text')
+            result.pop('speech_regions', None)
+            transcript_cache.put(cache_key, transcript)
+            segment_cache.put(cache_key, json.dumps(result))
+        segments = result['segments']
+        _record_skipped(meeting, result)
         print(f"Transcription complete. Length: {len(transcript)} characters")
         
         # Save transcript
-        transcript_path = f"transcriptions/{task_id}_transcript.txt"
-        os.makedirs("transcriptions", exist_ok=True)
-        with open(transcript_path, 'w') as f:
-            f.write(transcript)
+        transcript_file = transcript_path(task_id)
+        if not transcript_cache.link(cache_key, transcript_file):
+            _write_transcript(transcript_file, transcript)
         
-        meeting.transcript = transcript
-        meeting.status = 'summarizing'
-        db.commit()
-        
-        # Summarize
-        print(f"Starting summarization for task {task_id}")
-        summary = summarize_transcript(transcript)
-        print(f"Summarization complete")
-        
-        # Save summary
-        summary_path = f"summaries/{task_id}_summary.json"
-        os.makedirs("summaries", exist_ok=True)
-        with open(summary_path, 'w') as f:
-            json.dump(summary, f, indent=2)
-        
-        meeting.summary_overview = summary['overview']
-        meeting.summary_data = json.dumps(summary)
-        meeting.status = 'completed'
-        meeting.completed_at = datetime.utcnow()
-        db.commit()
-        
-        print(f"✅ Processing complete for task {task_id}")
+        with timed('db_commit'):
+            store_segments(db, meeting, segments)
+            meeting.transcript = transcript
+            meeting.transcript_bytes = file_size(transcript_file)
+            meeting.status = 'summarizing'
+            meeting.add_trace_spans(current_spans())
+            db.commit()
+        hub.publish(task_id, 'summarizing', 0)
+        return True
         
     except Exception as e:
-        print(f"Error processing audio: {str(e)}")
+        print(f"Error transcribing audio: {str(e)}")
         import traceback
         traceback.print_exc()
         
-        meeting = db.query(Meeting).filter(Meeting.task_id == task_id).first()
-        if meeting:
-            meeting.status = 'error'
-            db.commit()
+        _mark_error(task_id, db)
+        return False
 
-async def process_live_recording(session_id: str, db: Session, manager, websocket):
-    """Process live recording: transcribe and summarize"""
+@traced
+def summarize_meeting(task_id: str, db: Session) -> bool:
+    """Summarization stage: summarize a transcribed meeting and mark it completed"""
     try:
-        filepath = f"uploads/{session_id}_recording.webm"
-        
-        if not os.path.exists(filepath):
-            raise FileNotFoundError(f"Recording file not found: {filepath}")
-        
-        meeting = db.query(Meeting).filter(Meeting.task_id == session_id).first()
-        meeting.status = 'transcribing'
-        db.commit()
-        
-        print(f"Transcribing live recording: {filepath}")
-        transcript = transcribe_audio(filepath)
-        print(f"Transcription complete: {len(transcript)} characters")
-        
-        meeting.transcript = transcript
-        meeting.status = 'summarizing'
-        db.commit()
+        meeting = db.query(Meeting).filter(Meeting.task_id == task_id).first()
+        if not meeting:
+            print(f"Meeting with task_id {task_id} not found")
+            return False
         
-        print(f"Summarizing transcript...")
-        summary = summarize_transcript(transcript)
+        # Summarize
+        transcript = meeting.transcript or ""
+        print(f"Starting summarization for task {task_id}")
+        with timed('summarize'):
+            summary = summarize_transcript(transcript, on_progress=_stage_progress(task_id, 'summarizing'))
         print(f"Summarization complete")
         
-        meeting.summary_overview = summary['overview']
-        meeting.summary_data = json.dumps(summary)
-        meeting.status = 'completed'
-        meeting.completed_at = datetime.utcnow()
-        db.commit()
+        # Save summary
+        summary_file = summary_path(task_id)
+        if not summary_cache.link(summary_cache_key(transcript), summary_file):
+            os.makedirs(os.path.dirname(summary_file), exist_ok=True)
+            with open(summary_file, 'w') as f:
+                json.dump(summary, f, indent=2)
         
-        await manager.send_message({
-            'type': 'processing_complete',
-            'session_id': session_id,
-            'summary': summary,
-            'transcript': transcript
-        }, websocket)
+        with timed('db_commit'):
+            meeting.summary_overview = summary['overview']
+            meeting.summary_bytes = file_size(summary_file)
+            meeting.summary_data = json.dumps(summary)
+            meeting.status = 'completed'
+            meeting.completed_at = datetime.utcnow()
+            meeting.add_trace_spans(current_spans())
+            db.commit()
+        hub.publish(task_id, 'completed', 100)
+        storage.request_compaction()
+        
+        print(f"✅ Processing complete for task {task_id}")
+        return True
         
     except Exception as e:
-        print(f"Error in live recording: {str(e)}")
+        print(f"Error summarizing transcript: {str(e)}")
         import traceback
         traceback.print_exc()
         
-        meeting = db.query(Meeting).filter(Meeting.task_id == session_id).first()
-        if meeting:
-            meeting.status = 'error'
-            db.commit()
+        _mark_error(task_id, db)
+        return False
+
+def process_audio_file(filepath: str, task_id: str, db: Session):
+    """Process uploaded audio file: transcribe and summarize"""
+    if transcribe_meeting(task_id, db):
+        summarize_meeting(task_id, db)
+
+def _mark_error(task_id: str, db: Session):
+    db.rollback()
+    meeting = db.query(Meeting).filter(Meeting.task_id == task_id).first()
+    if meeting:
+        meeting.status = 'error'
+        db.commit()
+    hub.publish(task_id, 'error')
+
+@traced
+async def finish_streaming_transcript(session_id: str, transcriber) -> bool:
+    """Transcription stage of a streaming live recording.
+
+    Most of the audio is already transcribed by `transcriber`; only the tail
+    after its last committed pass is decoded here, without blocking the event
+    loop. Summarization is left to the job scheduler.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            meeting = (await db.execute(select(Meeting).where(Meeting.task_id == session_id))).scalars().first()
+            if not meeting:
+                print(f"Meeting with task_id {session_id} not found")
+                return False
+            
+            meeting.status = 'transcribing'
+            await db.commit()
+            hub.publish(session_id, 'transcribing', 0)
+            
+            print(f"Finishing live transcript for session {session_id}")
+            with timed('live_transcribe'):
+                transcript = await transcriber.finish()
+                segments = transcriber.segments
+            print(f"Transcription complete: {len(transcript)} characters")
+            
+            transcript_file = transcript_path(session_id)
+            await asyncio.to_thread(_write_transcript, transcript_file, transcript)
+            
+            with timed('db_commit'):
+                await db.run_sync(lambda sync_db: store_segments(sync_db, meeting, segments))
+                meeting.transcript = transcript
+                meeting.transcript_bytes = file_size(transcript_file)
+                meeting.realtime_factor = transcriber.realtime_factor
+                meeting.status = 'summarizing'
+                meeting.add_trace_spans(current_spans())
+                await db.commit()
+            hub.publish(session_id, 'summarizing', 0)
+            return True
+            
+        except Exception as e:
+            print(f"Error in live recording: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            
+            await db.rollback()
+            meeting = (await db.execute(select(Meeting).where(Meeting.task_id == session_id))).scalars().first()
+            if meeting:
+                meeting.status = 'error'
+                await db.commit()
+            hub.publish(session_id, 'error')
+            return False
@@ -0,0 +1,97 @@
+import asyncio
+import hashlib
+import os
+import secrets
+import subprocess
+import wave
+from datetime import datetime
+from typing import Optional
+
+from fastapi import UploadFile
+
+from app.config import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES
+from app.services.whisper_engine import SAMPLE_RATE
+
+ALLOWED_EXTENSIONS = {'mp3', 'wav', 'mp4', 'm4a', 'webm', 'ogg'}
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES"""
+
+def allowed_file(filename: str) -> bool:
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def new_task_id() -> str:
+    """Sortable, collision-free id: the upload time plus a random suffix"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(4)}"
+
+def _write_chunk(buffer, digest, chunk: bytes):
+    digest.update(chunk)
+    buffer.write(chunk)
+
+async def save_upload(file: UploadFile, filepath: str, max_bytes: int = MAX_UPLOAD_BYTES) -> tuple[int, str]:
+    """Stream an upload to disk in fixed-size chunks; returns (size, sha256 hex digest)"""
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(filepath, "wb") as buffer:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"File exceeds the {max_bytes} byte limit")
+                await asyncio.to_thread(_write_chunk, buffer, digest, chunk)
+    except BaseException:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        raise
+    return size, digest.hexdigest()
+
+def _extract_command(source_path: str, target_path: str) -> list[str]:
+    return [
+        "ffmpeg", "-nostdin", "-y", "-i", source_path,
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-acodec", "pcm_s16le",
+        target_path
+    ]
+
+def _extracted(source_path: str, target_path: str, returncode: int, stderr: bytes) -> bool:
+    if returncode != 0:
+        print(f"Audio extraction failed for {source_path}: {stderr.decode(errors='replace')[-500:]}")
+        if os.path.exists(target_path):
+            os.remove(target_path)
+        return False
+    return True
+
+async def extract_audio(source_path: str, target_path: str) -> bool:
+    """Extract the audio track as 16 kHz mono WAV so Whisper skips the container decode"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *_extract_command(source_path, target_path),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+    except FileNotFoundError:
+        print("⚠️ ffmpeg not found; audio will be decoded from the original upload")
+        return False
+    return _extracted(source_path, target_path, process.returncode, stderr)
+
+def extract_audio_blocking(source_path: str, target_path: str) -> bool:
+    """extract_audio for worker threads"""
+    try:
+        process = subprocess.run(
+            _extract_command(source_path, target_path), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+    except FileNotFoundError:
+        print("⚠️ ffmpeg not found; audio will be decoded from the original upload")
+        return False
+    return _extracted(source_path, target_path, process.returncode, process.stderr)
+
+def wav_seconds(path: str) -> Optional[float]:
+    """Duration of a WAV file from its header, or None if it can't be read"""
+    try:
+        with wave.open(path, "rb") as f:
+            return f.getnframes() / f.getframerate()
+    except (OSError, EOFError, wave.Error):
+        return None
@@ -0,0 +1,102 @@
+import numpy as np
+
+# Analysis frame for the energy detector
+FRAME_SECONDS = 0.03
+# Frames quieter than this (dBFS) are never speech, however quiet the recording
+MIN_SPEECH_DB = -60.0
+# Silence inserted between joined speech regions so words don't run together
+JOIN_GAP_SECONDS = 0.5
+
+def frame_energy_db(audio: np.ndarray, frame_length: int) -> np.ndarray:
+    """Mean power of each full frame, in dBFS"""
+    n_frames = len(audio) // frame_length
+    frames = audio[:n_frames * frame_length].reshape(n_frames, frame_length)
+    power = np.einsum("ij,ij->i", frames, frames) / frame_length
+    return 10 * np.log10(power + 1e-10)
+
+def _runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Start (inclusive) and end (exclusive) indices of each run of True"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return edges[0::2], edges[1::2]
+
+def _close_gaps(starts: np.ndarray, ends: np.ndarray, min_gap: int) -> tuple[np.ndarray, np.ndarray]:
+    """Merge runs separated by fewer than `min_gap` units"""
+    if len(starts) < 2:
+        return starts, ends
+    keep = starts[1:] - ends[:-1] >= min_gap
+    return starts[np.concatenate(([True], keep))], ends[np.concatenate((keep, [True]))]
+
+def speech_regions(
+    audio: np.ndarray,
+    sample_rate: int,
+    threshold_db: float = 12.0,
+    min_silence: float = 1.0,
+    min_speech: float = 0.25,
+    pad: float = 0.3
+) -> list[tuple[int, int]]:
+    """Find speech as (start, end) sample ranges.
+
+    A frame is speech when it is `threshold_db` above the recording's noise
+    floor (its 10th-percentile frame energy). Pauses shorter than
+    `min_silence` seconds are kept, blips shorter than `min_speech` dropped,
+    and each region padded by `pad` seconds so word edges aren't clipped.
+    """
+    frame_length = int(sample_rate * FRAME_SECONDS)
+    energy = frame_energy_db(audio, frame_length)
+    if len(energy) == 0:
+        return []
+
+    floor, peak = np.percentile(energy, [10, 95])
+    # Recordings that are speech throughout have no real floor; stay below their peak
+    threshold = max(min(floor + threshold_db, peak - threshold_db), MIN_SPEECH_DB)
+    starts, ends = _runs(energy > threshold)
+
+    starts, ends = _close_gaps(starts, ends, int(min_silence / FRAME_SECONDS))
+    long_enough = ends - starts >= int(min_speech / FRAME_SECONDS)
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    pad_samples = int(pad * sample_rate)
+    starts = np.maximum(starts * frame_length - pad_samples, 0)
+    ends = np.minimum(ends * frame_length + pad_samples, len(audio))
+    starts, ends = _close_gaps(starts, ends, 1)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def batch_regions(regions: list[tuple[int, int]], max_samples: int) -> list[list[tuple[int, int]]]:
+    """Group consecutive regions into batches of at most `max_samples` speech each"""
+    batches, current, current_samples = [], [], 0
+    for start, end in regions:
+        if current and current_samples + (end - start) > max_samples:
+            batches.append(current)
+            current, current_samples = [], 0
+        current.append((start, end))
+        current_samples += end - start
+    if current:
+        batches.append(current)
+    return batches
+
+def join_regions(audio: np.ndarray, regions: list[tuple[int, int]], sample_rate: int):
+    """Concatenate regions with short silent gaps.
+
+    Returns the joined audio and its timeline: for each region, where it
+    starts in the joined audio and where it starts and ends originally (seconds).
+    """
+    gap = np.zeros(int(JOIN_GAP_SECONDS * sample_rate), dtype=audio.dtype)
+    pieces, joined_starts = [], []
+    position = 0
+    for start, end in regions:
+        joined_starts.append(position)
+        pieces.extend((audio[start:end], gap))
+        position += end - start + len(gap)
+    timeline = (
+        np.array(joined_starts) / sample_rate,
+        np.array([start for start, _ in regions]) / sample_rate,
+        np.array([end for _, end in regions]) / sample_rate
+    )
+    return np.concatenate(pieces), timeline
+
+def map_times(times, timeline) -> np.ndarray:
+    """Map times in joined audio back onto the original recording"""
+    joined_starts, original_starts, original_ends = timeline
+    times = np.asarray(times, dtype=np.float64)
+    index = np.maximum(np.searchsorted(joined_starts, times, side="right") - 1, 0)
+    return np.minimum(original_starts[index] + times - joined_starts[index], original_ends[index])
@@ -0,0 +1,487 @@
+import os
+import time
+import itertools
+import subprocess
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from app.config import WHISPER_MODEL, WHISPER_POOL_SIZE, WHISPER_POOLS, WHISPER_MEMORY_BUDGET_MB
+from app.services.metrics import gauge
+
+SAMPLE_RATE = 16000
+# Chunk planning only needs loudness, so it decodes at a lower rate
+PLAN_SAMPLE_RATE = 4000
+
+# Approximate resident memory of one worker process holding each model (MB)
+MODEL_MEMORY_MB = {"tiny": 400, "base": 600, "small": 1400, "medium": 3400, "large": 6800}
+AVAILABLE_MODELS = (
+    "tiny", "tiny.en", "base", "base.en", "small", "small.en",
+    "medium", "medium.en", "large", "large-v1", "large-v2", "large-v3"
+)
+
+# Model owned by the current worker process (never set in the API process)
+_worker_model = None
+# Queue back to the parent for (job_id, percent decoded) progress reports
+_progress_queue = None
+
+def _init_worker(model_size: str, progress_queue=None):
+    """Load the Whisper model once when a worker process starts"""
+    global _worker_model, _progress_queue
+    import whisper
+    _progress_queue = progress_queue
+    print(f"Loading Whisper model '{model_size}' in worker {os.getpid()}...")
+    _worker_model = whisper.load_model(model_size)
+    print(f"✅ Whisper model '{model_size}' loaded in worker {os.getpid()}")
+
+def _ping() -> int:
+    return os.getpid()
+
+def _segments(result: dict, offset: float = 0.0) -> list[dict]:
+    return [
+        {
+            "start": seg["start"] + offset,
+            "end": seg["end"] + offset,
+            "text": seg["text"].strip(),
+            "avg_logprob": seg.get("avg_logprob")
+        }
+        for seg in result["segments"]
+    ]
+
+def _progress_bar(job_id: int, base: float = 0.0, span: float = 100.0):
+    """tqdm replacement that reports how far Whisper has decoded into the audio,
+    scaled into [base, base + span] percent"""
+    import tqdm
+
+    class ProgressBar(tqdm.tqdm):
+        def __init__(self, *args, total=None, **kwargs):
+            super().__init__(*args, total=total, **kwargs)
+            self._frames_total = total or 0
+            self._frames_done = 0
+            self._reported = -1
+
+        def update(self, n=1):
+            super().update(n)
+            self._frames_done += n
+            if not self._frames_total:
+                return
+            percent = int(base + span * min(self._frames_done, self._frames_total) / self._frames_total)
+            if percent != self._reported:
+                self._reported = percent
+                _progress_queue.put((job_id, percent))
+
+    return ProgressBar
+
+@contextmanager
+def _reporting_progress(job_id: Optional[int], base: float = 0.0, span: float = 100.0):
+    if job_id is None or _progress_queue is None:
+        yield
+        return
+    # whisper.transcribe drives a tqdm bar over the audio frames it has decoded
+    import tqdm
+    original = tqdm.tqdm
+    tqdm.tqdm = _progress_bar(job_id, base, span)
+    try:
+        yield
+    finally:
+        tqdm.tqdm = original
+
+def _transcribe(filepath: str, options: dict, job_id: Optional[int] = None, vad: Optional[dict] = None) -> dict:
+    if vad is not None:
+        return _transcribe_samples(_load_audio(filepath), options, job_id, vad)
+    with _reporting_progress(job_id):
+        result = _worker_model.transcribe(filepath, **options)
+    return {"text": result["text"], "segments": _segments(result)}
+
+def _transcribe_range(
+    filepath: str, start: float, end: float, options: dict,
+    job_id: Optional[int] = None, vad: Optional[dict] = None
+) -> dict:
+    """Transcribe one window of a finished file, on the original timeline"""
+    return _transcribe_samples(_load_audio(filepath, start, end - start), options, job_id, vad, offset=start)
+
+def _transcribe_samples(audio, options: dict, job_id: Optional[int], vad: Optional[dict], offset: float = 0.0) -> dict:
+    """Transcribe decoded audio; with `vad`, only the speech regions it finds"""
+    if vad is None:
+        with _reporting_progress(job_id):
+            result = _worker_model.transcribe(audio, **options)
+        return {"text": result["text"], "segments": _segments(result, offset)}
+    
+    from app.services.vad import speech_regions, batch_regions, join_regions, map_times
+    detector = dict(vad)
+    batch_seconds = detector.pop("batch_seconds")
+    
+    regions = speech_regions(audio, SAMPLE_RATE, **detector)
+    speech_samples = sum(end - start for start, end in regions)
+    
+    texts, segments, done = [], [], 0
+    for batch in batch_regions(regions, int(batch_seconds * SAMPLE_RATE)):
+        joined, timeline = join_regions(audio, batch, SAMPLE_RATE)
+        batch_samples = sum(end - start for start, end in batch)
+        batch_options = dict(options)
+        if texts and texts[-1].strip():
+            # Carry context across batches like Whisper does across its own windows
+            batch_options["initial_prompt"] = texts[-1][-200:]
+        with _reporting_progress(job_id, 100 * done / speech_samples, 100 * batch_samples / speech_samples):
+            result = _worker_model.transcribe(joined, **batch_options)
+        done += batch_samples
+        
+        batch_segments = _segments(result)
+        if batch_segments:
+            starts = map_times([seg["start"] for seg in batch_segments], timeline)
+            ends = map_times([seg["end"] for seg in batch_segments], timeline)
+            for seg, start, end in zip(batch_segments, starts, ends):
+                seg["start"], seg["end"] = float(start) + offset, float(end) + offset
+        segments.extend(batch_segments)
+        texts.append(result["text"])
+    
+    return {
+        "text": "".join(texts),
+        "segments": segments,
+        "audio_seconds": len(audio) / SAMPLE_RATE,
+        "speech_seconds": speech_samples / SAMPLE_RATE,
+        "speech_regions": [(offset + start / SAMPLE_RATE, offset + end / SAMPLE_RATE) for start, end in regions]
+    }
+
+def _plan_chunks(filepath: str, chunk_seconds: float, overlap: float) -> list[tuple[float, float, float, float]]:
+    from app.services.chunking import plan_chunks
+    audio = _load_audio(filepath, sample_rate=PLAN_SAMPLE_RATE)
+    return plan_chunks(audio, PLAN_SAMPLE_RATE, chunk_seconds, overlap)
+
+def _load_audio(
+    filepath: str, start: float = 0.0, duration: Optional[float] = None,
+    sample_rate: int = SAMPLE_RATE, growing: bool = False
+):
+    """Decode audio from `start` seconds (to the end, or for `duration` seconds) as mono float32.
+
+    Raises RuntimeError if ffmpeg fails, unless the file is a live recording
+    that is still `growing`.
+    """
+    import numpy as np
+    # Input seeking: only the window is decoded. A growing WebM has no cue
+    # index yet, so the demuxer scans clusters up to `start` without decoding them
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0", "-ss", str(start)]
+    if duration is not None:
+        cmd += ["-t", str(duration)]
+    cmd += ["-i", filepath]
+    cmd += ["-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-"]
+    process = subprocess.run(cmd, capture_output=True)
+    # A recording that is still being written ends mid-cluster, so ffmpeg may
+    # exit non-zero after emitting every complete frame; keep what it decoded
+    if process.returncode != 0 and not growing:
+        raise RuntimeError(f"Failed to decode {filepath}: {process.stderr.decode(errors='replace')[-500:]}")
+    return np.frombuffer(process.stdout, np.int16).flatten().astype(np.float32) / 32768.0
+
+def _transcribe_window(filepath: str, start: float, options: dict) -> dict:
+    """Transcribe from `start` to the current end of the file, on the original timeline"""
+    audio = _load_audio(filepath, start, growing=True)
+    end = start + len(audio) / SAMPLE_RATE
+    if len(audio) == 0:
+        return {"end": end, "segments": []}
+    result = _worker_model.transcribe(audio, **options)
+    return {"end": end, "segments": _segments(result, start)}
+
+class TranscriptionEngine:
+    """Pool of worker processes that each hold one preloaded Whisper model"""
+
+    def __init__(self, model_size: str, workers: int, on_start: Optional[Callable[["TranscriptionEngine"], None]] = None):
+        self.model_size = model_size
+        self.workers = max(1, workers)
+        # Called before the worker processes are spawned, e.g. to make room within a memory budget
+        self.on_start = on_start
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._progress_queue = None
+        self._progress_callbacks: dict[int, Callable[[float], None]] = {}
+        self._job_ids = itertools.count()
+        self._active = 0
+        self._active_lock = threading.RLock()
+        self.last_used = time.monotonic()
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    @property
+    def busy(self) -> bool:
+        return self._active > 0
+
+    @property
+    def memory_mb(self) -> int:
+        family = self.model_size.split(".")[0].split("-")[0]
+        return self.workers * MODEL_MEMORY_MB.get(family, 1000)
+
+    def start(self):
+        """Spawn the worker processes and wait for each to load its model"""
+        self._begin()
+        try:
+            self._before_start()
+            with self._lock:
+                executor = self._ensure_executor()
+            pings = [executor.submit(_ping) for _ in range(self.workers)]
+            for ping in pings:
+                ping.result()
+        finally:
+            self._end()
+
+    def submit(
+        self,
+        filepath: str,
+        on_progress: Optional[Callable[[float], None]] = None,
+        vad: Optional[dict] = None,
+        **options
+    ) -> Future:
+        """Transcribe a file; `on_progress` receives the percentage decoded so far.
+
+        With `vad` (speech_regions arguments plus batch_seconds) only detected
+        speech is decoded, and the result also reports audio_seconds and speech_seconds.
+        """
+        return self._submit_tracked(on_progress, _transcribe, filepath, options, vad=vad)
+
+    def submit_chunked(
+        self,
+        filepath: str,
+        chunk_seconds: float,
+        overlap: float,
+        on_progress: Optional[Callable[[float], None]] = None,
+        vad: Optional[dict] = None,
+        max_parallel: Optional[int] = None,
+        **options
+    ) -> Future:
+        """Transcribe a long file as overlapping windows on several workers at once.
+
+        Windows are cut at quiet points near every `chunk_seconds`, run at most
+        `max_parallel` at a time (default: every worker) and stitched back into
+        one result. Files shorter than about one chunk run as a single job.
+        """
+        future = Future()
+        # Counts as busy for the whole job, not just while a chunk is running
+        self._begin()
+        
+        def run():
+            try:
+                future.set_result(self._run_chunked(
+                    filepath, chunk_seconds, overlap, on_progress, vad, max_parallel or self.workers, options
+                ))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._end()
+        
+        threading.Thread(target=run, name=f"whisper-{self.model_size}-chunks", daemon=True).start()
+        return future
+
+    def submit_window(self, filepath: str, start: float, **options) -> Future:
+        """Transcribe a growing recording from `start` seconds; resolves to {end, segments}"""
+        return self._submit(_transcribe_window, filepath, start, options)
+
+    def stop_if_idle(self) -> bool:
+        """Shut the pool down unless a job is running or being submitted; returns whether it stopped"""
+        with self._active_lock:
+            if self._active:
+                return False
+            self.shutdown()
+            return True
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._progress_queue is not None:
+                self._progress_queue.put(None)
+                self._progress_queue = None
+
+    def _begin(self):
+        with self._active_lock:
+            self._active += 1
+            self.last_used = time.monotonic()
+
+    def _end(self):
+        with self._active_lock:
+            self._active -= 1
+            self.last_used = time.monotonic()
+
+    def _before_start(self):
+        # Busy from here on (the caller has run _begin), so the pool can't be unloaded
+        # between making room for it and spawning it
+        if not self.running and self.on_start:
+            self.on_start(self)
+
+    def _submit(self, fn, *args, **kwargs) -> Future:
+        self._begin()
+        try:
+            self._before_start()
+            with self._lock:
+                try:
+                    future = self._ensure_executor().submit(fn, *args, **kwargs)
+                except BrokenProcessPool:
+                    # A worker died (e.g. decoder crash); replace the whole pool, which
+                    # takes the same memory as the one it replaces
+                    print(f"⚠️ Whisper '{self.model_size}' pool broken, restarting workers")
+                    self._executor = None
+                    future = self._ensure_executor().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._end()
+            raise
+        future.add_done_callback(lambda _: self._end())
+        return future
+
+    def _submit_tracked(self, on_progress, fn, *args, **kwargs) -> Future:
+        """Submit a job whose worker reports progress under a fresh job_id"""
+        if on_progress is None:
+            return self._submit(fn, *args, **kwargs)
+        job_id = next(self._job_ids)
+        self._progress_callbacks[job_id] = on_progress
+        future = self._submit(fn, *args, job_id=job_id, **kwargs)
+        future.add_done_callback(lambda _: self._progress_callbacks.pop(job_id, None))
+        return future
+
+    def _run_chunked(self, filepath, chunk_seconds, overlap, on_progress, vad, max_parallel, options) -> dict:
+        from app.services.chunking import stitch_chunks
+        windows = self._submit(_plan_chunks, filepath, chunk_seconds, overlap).result()
+        if len(windows) == 1:
+            return self.submit(filepath, on_progress, vad, **options).result()
+        
+        print(f"Transcribing {filepath} in {len(windows)} chunks")
+        total = sum(end - start for start, end, _, _ in windows)
+        done = [0.0] * len(windows)
+        
+        def chunk_progress(index, length):
+            def report(percent):
+                done[index] = percent * length / total
+                if on_progress:
+                    on_progress(sum(done))
+            return report
+        
+        # Bound how many workers one file may occupy so other jobs still get a turn
+        slots = threading.BoundedSemaphore(max_parallel)
+        futures = []
+        try:
+            for index, (start, end, _, _) in enumerate(windows):
+                slots.acquire()
+                future = self._submit_tracked(
+                    chunk_progress(index, end - start), _transcribe_range, filepath, start, end, options, vad=vad
+                )
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
+            results = [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return stitch_chunks(windows, results)
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            if self._progress_queue is None:
+                # Handed to workers at spawn time; queues can't be passed per task
+                self._progress_queue = context.Queue()
+                threading.Thread(
+                    target=self._dispatch_progress, args=(self._progress_queue,),
+                    name=f"whisper-{self.model_size}-progress", daemon=True
+                ).start()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.model_size, self._progress_queue)
+            )
+        return self._executor
+
+    def _dispatch_progress(self, progress_queue):
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                return
+            job_id, percent = item
+            callback = self._progress_callbacks.get(job_id)
+            if callback:
+                try:
+                    callback(percent)
+                except Exception as e:
+                    print(f"Progress callback failed: {str(e)}")
+
+def _parse_pools(spec: str) -> dict[str, int]:
+    pools = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        model_size, _, workers = entry.partition(":")
+        pools[model_size.strip()] = int(workers) if workers else WHISPER_POOL_SIZE
+    return pools
+
+class ModelRegistry:
+    """Whisper pools by model size, each started on first use.
+
+    Before a pool starts (or restarts after being unloaded), idle pools are
+    shut down, least recently used first, until the estimated memory of
+    running and starting pools fits `budget_mb` (0 disables the budget).
+    """
+
+    def __init__(self, pool_sizes: dict[str, int], default_workers: int, budget_mb: int):
+        self.pool_sizes = pool_sizes
+        self.default_workers = default_workers
+        self.budget_mb = budget_mb
+        self._engines: dict[str, TranscriptionEngine] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_size: Optional[str] = None) -> TranscriptionEngine:
+        model_size = model_size or WHISPER_MODEL
+        with self._lock:
+            engine = self._engines.get(model_size)
+            if engine is None:
+                workers = self.pool_sizes.get(model_size, self.default_workers)
+                engine = self._engines[model_size] = TranscriptionEngine(model_size, workers, on_start=self._reserve)
+            engine.last_used = time.monotonic()
+            return engine
+
+    def engines(self) -> list[TranscriptionEngine]:
+        with self._lock:
+            return list(self._engines.values())
+
+    def _reserve(self, engine: TranscriptionEngine):
+        with self._lock:
+            self._make_room(engine)
+
+    def _make_room(self, engine: TranscriptionEngine):
+        if not self.budget_mb:
+            return
+        # Busy pools that aren't running yet are about to start, so they count too
+        loaded = [e for e in self._engines.values() if (e.running or e.busy) and e is not engine]
+        used = sum(e.memory_mb for e in loaded)
+        for idle in sorted((e for e in loaded if e.running and not e.busy), key=lambda e: e.last_used):
+            if used + engine.memory_mb <= self.budget_mb:
+                break
+            if idle.stop_if_idle():
+                print(f"♻️ Unloaded idle Whisper '{idle.model_size}' to stay within the memory budget")
+                used -= idle.memory_mb
+        if used + engine.memory_mb > self.budget_mb:
+            # Busy pools can't be stopped mid-job; run over budget rather than fail
+            print(f"⚠️ Starting Whisper '{engine.model_size}' over the memory budget "
+                  f"({used + engine.memory_mb} of {self.budget_mb} MB)")
+
+registry = ModelRegistry(_parse_pools(WHISPER_POOLS), WHISPER_POOL_SIZE, WHISPER_MEMORY_BUDGET_MB)
+
+gauge("whisper_active_jobs", "Transcription jobs running or queued on each Whisper pool",
+      lambda: {engine.model_size: engine._active for engine in registry.engines()}, label="model")
+gauge("whisper_loaded_memory_mb", "Approximate memory held by running Whisper pools",
+      lambda: sum(engine.memory_mb for engine in registry.engines() if engine.running))
+
+def get_engine(model_size: Optional[str] = None) -> TranscriptionEngine:
+    """Return the pool for a model size; it starts on first use"""
+    return registry.get(model_size)
+
+def start_engines():
+    """Preload the pools configured in WHISPER_POOLS"""
+    for model_size in registry.pool_sizes:
+        registry.get(model_size).start()
+
+def shutdown_engines():
+    for engine in registry.engines():
+        engine.shutdown()
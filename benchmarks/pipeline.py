@@ -0,0 +1,563 @@
+"""Offline benchmark of the upload -> transcribe -> summarize pipeline.
+
+Runs the app in-process (uvicorn on a free local port) against a temporary
+database and working directory, with generated meeting-like audio, a stub
+Ollama server and, by default, a stub Whisper whose CPU time scales with the
+audio length. Writes a JSON report of per-stage latency, upload and
+websocket throughput, event loop lag and peak memory, which can be diffed
+between versions.
+
+    python benchmarks/pipeline.py --uploads 8 --concurrency 4 --ws-sessions 2 --output report.json
+    python benchmarks/pipeline.py --compare before.json after.json
+    python benchmarks/pipeline.py --ws-sessions 4 --ws-streaming --max-loop-lag 0.1
+    python benchmarks/pipeline.py --whisper real --chunk-accuracy recording.wav
+
+Needs ffmpeg on PATH, like the app itself.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_RATE = 16000
+
+# Installed as the `whisper` package for the worker processes when --whisper=stub
+STUB_WHISPER = '''
+import os
+import time
+
+REALTIME_FACTOR = float(os.environ.get("BENCH_WHISPER_RTF", "0.05"))
+WORDS = "the budget review covers hiring plans for next quarter and the launch timeline".split()
+
+class StubModel:
+    """Burns CPU in proportion to the audio length and returns filler segments"""
+
+    def transcribe(self, audio, **options):
+        if isinstance(audio, str):
+            from app.services.whisper_engine import _load_audio
+            audio = _load_audio(audio)
+        seconds = len(audio) / 16000
+        deadline = time.perf_counter() + seconds * REALTIME_FACTOR
+        while time.perf_counter() < deadline:
+            pass
+        segments = []
+        start = 0.0
+        while start < seconds:
+            end = min(seconds, start + 5.0)
+            i = len(segments)
+            text = " " + " ".join(WORDS[(i * 3 + k) % len(WORDS)] for k in range(8))
+            segments.append({"start": start, "end": end, "text": text, "avg_logprob": -0.2})
+            start = end
+        return {"text": "".join(s["text"] for s in segments), "segments": segments}
+
+def load_model(name, *args, **kwargs):
+    return StubModel()
+'''
+
+STUB_SUMMARY = {
+    "overview": "The team reviewed the budget and agreed on the launch timeline.",
+    "key_points": ["Budget review", "Hiring plans", "Launch timeline"],
+    "action_items": ["Share the revised budget"],
+    "decisions": ["Launch next quarter"]
+}
+
+# ---------------------------------------------------------------------------
+# Fixtures
+
+def synth_meeting(path: str, seconds: float, seed: int):
+    """Write a mono 16 kHz WAV of voiced bursts, short pauses and occasional long silences"""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    audio = 0.002 * rng.standard_normal(total)
+    position = 0
+    while position < total:
+        if rng.random() < 0.1:
+            position += int(rng.uniform(3, 10) * SAMPLE_RATE)
+            continue
+        length = min(int(rng.uniform(0.3, 2.5) * SAMPLE_RATE), total - position)
+        t = np.arange(length) / SAMPLE_RATE
+        f0 = rng.uniform(100, 220) * (1 + 0.05 * np.sin(2 * np.pi * rng.uniform(3, 6) * t))
+        phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = np.sin(np.pi * np.arange(length) / length) ** 0.5
+        audio[position:position + length] += 0.2 * envelope * voiced
+        position += length + int(rng.uniform(0.1, 0.6) * SAMPLE_RATE)
+    samples = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.tobytes())
+
+def start_stub_ollama(token_delay: float) -> tuple[ThreadingHTTPServer, str]:
+    """Serve /api/generate like Ollama, streaming a fixed summary a few characters at a time"""
+    response = json.dumps(STUB_SUMMARY)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for i in range(0, len(response), 8):
+                    self._chunk(json.dumps({"response": response[i:i + 8], "done": False}) + "\n")
+                    if token_delay:
+                        time.sleep(token_delay)
+                self._chunk(json.dumps({"response": "", "done": True}) + "\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The app hangs up as soon as it has the final message
+                self.close_connection = True
+
+        def _chunk(self, text: str):
+            data = text.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# ---------------------------------------------------------------------------
+# Measurements
+
+def summarize_samples(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": round(ordered[len(ordered) // 2], 4),
+        "p95": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 4),
+        "max": round(ordered[-1], 4)
+    }
+
+class LoopLagProbe:
+    """Samples how late the server's event loop wakes from short sleeps.
+
+    Blocking work on the loop (a synchronous Whisper or Ollama call) shows up
+    as lag of the same length. Samples are grouped by benchmark phase.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.phase = "startup"
+        self.samples: dict[str, list[float]] = {}
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - started - self.interval
+            self.samples.setdefault(self.phase, []).append(max(0.0, lag))
+
+    async def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    def report(self) -> dict:
+        return {phase: summarize_samples(samples) for phase, samples in self.samples.items() if phase not in ("startup", "done")}
+
+def _hwm_mb(pid) -> float:
+    """Peak resident set size of a process from /proc (Linux)"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def peak_rss_mb() -> dict:
+    try:
+        api = _hwm_mb("self")
+    except OSError:
+        api = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    workers = []
+    for child in multiprocessing.active_children():
+        try:
+            workers.append(_hwm_mb(child.pid))
+        except OSError:
+            pass
+    return {
+        "api": round(api, 1),
+        "workers_total": round(sum(workers), 1),
+        "workers_max": round(max(workers, default=0.0), 1),
+        "workers": len(workers)
+    }
+
+async def wait_for_completion(client, task_id: str, timeout: float) -> str:
+    """Follow the task's event stream until it completes or fails; returns the final status"""
+    async with client.stream("GET", f"/events/{task_id}", timeout=timeout) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("data: "):
+                status = json.loads(line[6:])["status"]
+                if status in ("completed", "error"):
+                    return status
+    return "unknown"
+
+async def run_uploads(base_url: str, files: list[str], concurrency: int, audio_seconds: float, timeout: float) -> dict:
+    import httpx
+    slots = asyncio.Semaphore(concurrency)
+    response_times, end_to_end, statuses = [], [], []
+
+    async def one(client, path):
+        async with slots:
+            started = time.perf_counter()
+            try:
+                with open(path, "rb") as f:
+                    response = await client.post("/upload", files={"file": (os.path.basename(path), f, "audio/wav")})
+                response_times.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    statuses.append(f"http_{response.status_code}")
+                    return
+                status = await wait_for_completion(client, response.json()["task_id"], timeout)
+            except Exception as e:
+                statuses.append(type(e).__name__)
+                return
+            end_to_end.append(time.perf_counter() - started)
+            statuses.append(status)
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, trust_env=False) as client:
+        await asyncio.gather(*(one(client, path) for path in files))
+    wall = time.perf_counter() - started
+    completed = statuses.count("completed")
+    return {
+        "files": len(files),
+        "concurrency": concurrency,
+        "completed": completed,
+        "errors": {s: statuses.count(s) for s in set(statuses) if s != "completed"},
+        "wall_s": round(wall, 3),
+        "files_per_min": round(60 * completed / wall, 2),
+        "audio_seconds_per_s": round(completed * audio_seconds / wall, 2),
+        "upload_response_s": summarize_samples(response_times),
+        "end_to_end_s": summarize_samples(end_to_end)
+    }
+
+async def run_ws_sessions(ws_url: str, recordings: list[str], chunk_seconds: float, pace: float,
+                          streaming: bool, timeout: float, reconnect: bool = False) -> dict:
+    import websockets
+    ack_latencies, completion_times, statuses = [], [], []
+    chunk_bytes = int(chunk_seconds * SAMPLE_RATE * 2)
+
+    async def one(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        async with websockets.connect(ws_url, max_size=None) as ws:
+            await ws.send(json.dumps({"type": "start_recording", "streaming": streaming}))
+            session_id = json.loads(await ws.recv())["session_id"]
+            for seq, offset in enumerate(range(0, len(data), chunk_bytes)):
+                header = json.dumps({"session_id": session_id, "seq": seq}).encode()
+                sent = time.perf_counter()
+                await ws.send(struct.pack(">H", len(header)) + header + data[offset:offset + chunk_bytes])
+                while True:
+                    message = json.loads(await ws.recv())
+                    if message["type"] in ("chunk_saved", "error"):
+                        break
+                ack_latencies.append(time.perf_counter() - sent)
+                if pace:
+                    await asyncio.sleep(chunk_seconds / pace)
+            stopped = time.perf_counter()
+            await ws.send(json.dumps({"type": "stop_recording", "session_id": session_id}))
+            if reconnect:
+                # Drop the connection and pick the result up on a new one
+                while json.loads(await ws.recv())["type"] != "recording_stopped":
+                    pass
+                await ws.close()
+                ws = await websockets.connect(ws_url, max_size=None)
+                await ws.send(json.dumps({"type": "resume_recording", "session_id": session_id}))
+            deadline = stopped + timeout
+            while time.perf_counter() < deadline:
+                message = json.loads(await asyncio.wait_for(ws.recv(), deadline - time.perf_counter()))
+                if message["type"] == "processing_complete":
+                    completion_times.append(time.perf_counter() - stopped)
+                    statuses.append("completed")
+                    break
+            else:
+                statuses.append("timeout")
+            await ws.close()
+
+    async def guarded(path):
+        try:
+            await one(path)
+        except Exception as e:
+            statuses.append(type(e).__name__)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(guarded(path) for path in recordings))
+    return {
+        "sessions": len(recordings),
+        "streaming": streaming,
+        "reconnect": reconnect,
+        "completed": statuses.count("completed"),
+        "errors": {s: statuses.count(s) for s in set(statuses) if s != "completed"},
+        "wall_s": round(time.perf_counter() - started, 3),
+        "chunk_ack_s": summarize_samples(ack_latencies),
+        "stop_to_complete_s": summarize_samples(completion_times)
+    }
+
+# ---------------------------------------------------------------------------
+# Runner
+
+def configure(args, workdir: str, ollama_url: str):
+    """Point the app at the scratch directory and stubs; must run before app modules are imported"""
+    os.environ.update({
+        "SQLALCHEMY_DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "OLLAMA_URL": ollama_url,
+        "LLM_BACKEND": "ollama",
+        "WHISPER_MODEL": args.whisper_model,
+        "WHISPER_POOLS": f"{args.whisper_model}:{args.whisper_workers}",
+        "WHISPER_PRELOAD": "true",
+        "TRANSCRIPTION_WORKERS": str(args.transcription_workers),
+        "MAX_QUEUED_JOBS": str(max(20, args.uploads)),
+        "BENCH_WHISPER_RTF": str(args.rtf)
+    })
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    if args.whisper == "stub":
+        # Spawned Whisper workers inherit sys.path, so they import the stub too
+        stub_dir = os.path.join(workdir, "stub_modules")
+        os.makedirs(os.path.join(stub_dir, "whisper"))
+        with open(os.path.join(stub_dir, "whisper", "__init__.py"), "w") as f:
+            f.write(STUB_WHISPER)
+        sys.path.insert(0, stub_dir)
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "-C", REPO_ROOT, "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="meetscribe-bench-")
+    ollama, ollama_url = start_stub_ollama(args.llm_token_delay)
+    configure(args, workdir, ollama_url)
+
+    import uvicorn
+    import main
+    from app.services.timing import get_stage_timings, reset_stage_timings
+
+    os.makedirs("fixtures")
+    files = []
+    for i in range(args.uploads + args.ws_sessions):
+        path = os.path.join("fixtures", f"meeting_{i}.wav")
+        synth_meeting(path, args.audio_seconds, args.seed + i)
+        files.append(path)
+
+    probe = LoopLagProbe()
+    main.app.router.on_startup.append(probe.start)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        # Wait for the preloaded Whisper pool so startup isn't counted as transcription time
+        from app.services.whisper_engine import get_engine
+        get_engine(args.whisper_model).start()
+        reset_stage_timings()
+
+        probe.phase = "uploads"
+        uploads = asyncio.run(run_uploads(
+            f"http://127.0.0.1:{port}", files[:args.uploads], args.concurrency, args.audio_seconds, args.timeout
+        ))
+        probe.phase = "websocket"
+        websocket = asyncio.run(run_ws_sessions(
+            f"ws://127.0.0.1:{port}/ws", files[args.uploads:], args.ws_chunk_seconds, args.ws_pace,
+            args.ws_streaming, args.timeout, args.ws_reconnect
+        )) if args.ws_sessions else None
+        probe.phase = "done"
+        memory = peak_rss_mb()
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        ollama.shutdown()
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "benchmark": "pipeline",
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": {
+            key: getattr(args, key) for key in (
+                "uploads", "concurrency", "audio_seconds", "ws_sessions", "ws_chunk_seconds", "ws_pace",
+                "ws_streaming", "ws_reconnect", "whisper", "whisper_model", "whisper_workers", "transcription_workers",
+                "rtf", "llm_token_delay", "seed"
+            )
+        },
+        "stages": get_stage_timings(),
+        "uploads": uploads,
+        "websocket": websocket,
+        "event_loop_lag_s": probe.report(),
+        "peak_rss_mb": memory
+    }
+
+def check_chunk_accuracy(args) -> dict:
+    """Transcribe one recording single-pass and chunked, and measure how far the chunked text drifts"""
+    recording = os.path.abspath(args.chunk_accuracy)
+    workdir = tempfile.mkdtemp(prefix="meetscribe-bench-")
+    configure(args, workdir, "http://127.0.0.1:9")
+
+    from app.config import TRANSCRIBE_CHUNK_SECONDS, TRANSCRIBE_CHUNK_OVERLAP_SECONDS
+    from app.services.chunking import CHUNKED_WER_TOLERANCE, word_error_rate
+    from app.services.transcription import VAD_OPTIONS
+    from app.services.whisper_engine import get_engine
+
+    engine = get_engine(args.whisper_model)
+    try:
+        engine.start()
+        started = time.perf_counter()
+        single = engine.submit(recording, vad=VAD_OPTIONS).result()
+        single_s = time.perf_counter() - started
+        started = time.perf_counter()
+        chunked = engine.submit_chunked(
+            recording, TRANSCRIBE_CHUNK_SECONDS, TRANSCRIBE_CHUNK_OVERLAP_SECONDS, vad=VAD_OPTIONS
+        ).result()
+        chunked_s = time.perf_counter() - started
+    finally:
+        engine.shutdown()
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "benchmark": "chunk_accuracy",
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "recording": args.chunk_accuracy,
+        "config": {
+            "whisper": args.whisper,
+            "whisper_model": args.whisper_model,
+            "whisper_workers": args.whisper_workers,
+            "chunk_seconds": TRANSCRIBE_CHUNK_SECONDS,
+            "overlap_seconds": TRANSCRIBE_CHUNK_OVERLAP_SECONDS
+        },
+        "words": len(single["text"].split()),
+        "single_pass_s": round(single_s, 3),
+        "chunked_s": round(chunked_s, 3),
+        "word_error_rate": round(word_error_rate(single["text"], chunked["text"]), 4),
+        "tolerance": CHUNKED_WER_TOLERANCE
+    }
+
+def _flatten(report, prefix="") -> dict:
+    values = {}
+    for key, value in (report or {}).items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(_flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+def compare(before_path: str, after_path: str):
+    """Print every measurement that changed between two reports"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    old, new = _flatten({k: before.get(k) for k in ("stages", "uploads", "websocket", "event_loop_lag_s", "peak_rss_mb")}), \
+        _flatten({k: after.get(k) for k in ("stages", "uploads", "websocket", "event_loop_lag_s", "peak_rss_mb")})
+    print(f"{'metric':<48} {'before':>12} {'after':>12} {'change':>9}")
+    for key in sorted(set(old) | set(new)):
+        a, b = old.get(key), new.get(key)
+        if a == b:
+            continue
+        change = f"{100 * (b - a) / a:+.1f}%" if a and b is not None else ""
+        print(f"{key:<48} {a if a is not None else '-':>12} {b if b is not None else '-':>12} {change:>9}")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=8, help="files uploaded through /upload")
+    parser.add_argument("--concurrency", type=int, default=4, help="uploads in flight at once")
+    parser.add_argument("--audio-seconds", type=float, default=60, help="length of each generated meeting")
+    parser.add_argument("--ws-sessions", type=int, default=2, help="concurrent live recording sessions")
+    parser.add_argument("--ws-chunk-seconds", type=float, default=1.0, help="audio per binary websocket frame")
+    parser.add_argument("--ws-pace", type=float, default=0, help="send chunks at this multiple of real time (0: as fast as possible)")
+    parser.add_argument("--ws-streaming", action="store_true", help="use streaming transcription for sessions")
+    parser.add_argument("--ws-reconnect", action="store_true", help="reconnect after stop_recording and resume to get the result")
+    parser.add_argument("--whisper", choices=("stub", "real"), default="stub", help="stub Whisper or the installed package")
+    parser.add_argument("--whisper-model", default="base")
+    parser.add_argument("--whisper-workers", type=int, default=2)
+    parser.add_argument("--transcription-workers", type=int, default=2)
+    parser.add_argument("--rtf", type=float, default=0.05, help="stub Whisper CPU seconds per audio second")
+    parser.add_argument("--llm-token-delay", type=float, default=0.002, help="stub Ollama delay per streamed chunk")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--max-loop-lag", type=float, default=0,
+                        help="exit non-zero if the event loop lags more than this many seconds (0: no check)")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--keep-workdir", action="store_true")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="diff two reports instead of running")
+    parser.add_argument("--chunk-accuracy", metavar="RECORDING",
+                        help="instead of running, check chunked transcription of RECORDING against a single pass")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.chunk_accuracy and args.whisper == "stub":
+        parser.error("--chunk-accuracy needs --whisper real (the stub's text depends on where a window starts)")
+
+    output = os.path.abspath(args.output) if args.output else None
+    report = check_chunk_accuracy(args) if args.chunk_accuracy else run(args)
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+        print(f"📊 Benchmark report written to {output}")
+    else:
+        print(text)
+
+    if args.chunk_accuracy:
+        if report["word_error_rate"] > report["tolerance"]:
+            print(f"❌ Chunked transcript differs by {report['word_error_rate']:.1%} WER (limit {report['tolerance']:.1%})")
+            sys.exit(1)
+        print(f"✅ Chunked transcript within {report['tolerance']:.1%} WER ({report['word_error_rate']:.1%})")
+        return
+
+    if args.max_loop_lag:
+        worst = max((stats.get("max", 0) for stats in report["event_loop_lag_s"].values()), default=0)
+        if worst > args.max_loop_lag:
+            print(f"❌ Event loop lagged {worst:.3f}s (limit {args.max_loop_lag:.3f}s)")
+            sys.exit(1)
+        print(f"✅ Event loop lag stayed within {args.max_loop_lag:.3f}s (worst {worst:.3f}s)")
+
+if __name__ == "__main__":
+    main_cli()
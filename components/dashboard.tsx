@@ -1,10 +1,9 @@
 "use client";
 
 import { useState, useCallback } from "react";
-import useSWR from "swr";
+import useSWRInfinite from "swr/infinite";
 import { Upload, Mic, FileAudio, CheckCircle2, Loader2 } from "lucide-react";
-import { fetchMeetings, deleteMeeting } from "@/lib/api";
-import type { Meeting } from "@/lib/types";
+import { fetchMeetingsPage, deleteMeeting, type MeetingPage } from "@/lib/api";
 import { UploadZone } from "./upload-zone";
 import { AudioRecorder } from "./audio-recorder";
 import { MeetingCard } from "./meeting-card";
@@ -12,17 +11,33 @@ import { EmptyState } from "./empty-state";
 
 type InputMode = "upload" | "record";
 
+// Each page is keyed by the cursor from the page before it
+function getMeetingsKey(_index: number, previous: MeetingPage | null) {
+  if (previous && !previous.nextCursor) return null;
+  return ["meetings", previous?.nextCursor ?? null] as const;
+}
+
 export function Dashboard() {
   const [inputMode, setInputMode] = useState<InputMode>("upload");
   const {
-    data: meetings,
+    data: pages,
     error,
     isLoading,
+    isValidating,
     mutate,
-  } = useSWR<Meeting[]>("meetings", fetchMeetings, {
-    refreshInterval: 5000,
-    revalidateOnFocus: true,
-  });
+    size,
+    setSize,
+  } = useSWRInfinite<MeetingPage>(
+    getMeetingsKey,
+    ([, cursor]: readonly [string, string | null]) => fetchMeetingsPage(cursor),
+    {
+      refreshInterval: 5000,
+      revalidateOnFocus: true,
+    }
+  );
+  const meetings = pages?.flatMap((page) => page.meetings);
+  const hasMore = !!pages?.[pages.length - 1]?.nextCursor;
+  const isLoadingMore = isValidating && !!pages && pages.length < size;
 
   const handleUploadComplete = useCallback(
     (taskId: string) => {
@@ -55,7 +70,7 @@ export function Dashboard() {
   const completedCount = meetings?.filter((m) => m.status === "completed").length ?? 0;
   const processingCount =
     meetings?.filter((m) =>
-      ["transcribing", "summarizing", "processing", "uploaded"].includes(m.status)
+      ["transcribing", "summarizing", "processing", "uploaded", "importing"].includes(m.status)
     ).length ?? 0;
 
   return (
@@ -80,6 +95,7 @@ export function Dashboard() {
           </div>
           <p className="mt-1 text-2xl font-bold tabular-nums text-foreground">
             {meetings?.length ?? 0}
+            {hasMore ? "+" : ""}
           </p>
         </div>
         <div className="rounded-xl border border-border/60 bg-card p-4">
@@ -167,6 +183,16 @@ export function Dashboard() {
                 onDelete={handleDelete}
               />
             ))}
+            {hasMore && (
+              <button
+                onClick={() => setSize(size + 1)}
+                disabled={isLoadingMore}
+                className="flex w-full items-center justify-center gap-2 rounded-xl border border-border/60 bg-card px-4 py-3 text-sm font-medium text-muted-foreground transition-all hover:text-foreground disabled:opacity-60"
+              >
+                {isLoadingMore && <Loader2 className="h-4 w-4 animate-spin" />}
+                Load older meetings
+              </button>
+            )}
           </div>
         )}
       </div>
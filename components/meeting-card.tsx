@@ -4,10 +4,10 @@ import Link from "next/link";
 import { FileAudio, Mic, Clock, Trash2, ChevronRight } from "lucide-react";
 import { cn, formatDate } from "@/lib/utils";
 import { StatusBadge } from "./status-badge";
-import type { Meeting } from "@/lib/types";
+import type { MeetingListItem } from "@/lib/types";
 
 interface MeetingCardProps {
-  meeting: Meeting;
+  meeting: MeetingListItem;
   onDelete: (id: number) => void;
 }
 
@@ -54,9 +54,9 @@ export function MeetingCard({ meeting, onDelete }: MeetingCardProps) {
             <span className="capitalize">{meeting.recording_type}</span>
           )}
         </div>
-        {meeting.summary?.overview && (
+        {meeting.summary_overview && (
           <p className="mt-2 line-clamp-1 text-xs leading-relaxed text-muted-foreground">
-            {meeting.summary.overview}
+            {meeting.summary_overview}
           </p>
         )}
       </div>
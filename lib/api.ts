@@ -1,12 +1,31 @@
-import type { Meeting, UploadResponse } from "./types";
+import type {
+  Meeting,
+  MeetingListItem,
+  MeetingStatus,
+  ProgressEvent,
+  UploadResponse,
+} from "./types";
 
 // Point to your FastAPI backend
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
-export async function fetchMeetings(): Promise<Meeting[]> {
-  const res = await fetch(`${API_BASE}/meetings`);
+export const MEETINGS_PAGE_SIZE = 50;
+
+export interface MeetingPage {
+  meetings: MeetingListItem[];
+  // Cursor for the next (older) page; null on the last page
+  nextCursor: string | null;
+}
+
+export async function fetchMeetingsPage(cursor?: string | null): Promise<MeetingPage> {
+  const params = new URLSearchParams({ limit: String(MEETINGS_PAGE_SIZE) });
+  if (cursor) params.set("cursor", cursor);
+  const res = await fetch(`${API_BASE}/meetings?${params}`);
   if (!res.ok) throw new Error("Failed to fetch meetings");
-  return res.json();
+  return {
+    meetings: await res.json(),
+    nextCursor: res.headers.get("X-Next-Cursor"),
+  };
 }
 
 export async function fetchMeeting(id: number): Promise<Meeting> {
@@ -15,12 +34,28 @@ export async function fetchMeeting(id: number): Promise<Meeting> {
   return res.json();
 }
 
-export async function fetchMeetingStatus(taskId: string): Promise<Meeting> {
+export async function fetchMeetingStatus(taskId: string): Promise<MeetingStatus> {
   const res = await fetch(`${API_BASE}/status/${taskId}`);
   if (!res.ok) throw new Error("Failed to fetch status");
   return res.json();
 }
 
+// Streams progress until the meeting completes or fails; returns an unsubscribe function
+export function subscribeToMeeting(
+  taskId: string,
+  onEvent: (event: MeetingStatus | ProgressEvent) => void
+): () => void {
+  const source = new EventSource(`${API_BASE}/events/${taskId}`);
+  source.onmessage = (message) => {
+    const event = JSON.parse(message.data);
+    onEvent(event);
+    if (event.status === "completed" || event.status === "error") {
+      source.close();
+    }
+  };
+  return () => source.close();
+}
+
 export async function uploadAudio(file: File): Promise<UploadResponse> {
   const formData = new FormData();
   formData.append("file", file);
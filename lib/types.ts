@@ -10,6 +10,7 @@ export interface Meeting {
   task_id: string;
   filename: string;
   status:
+    | "importing"
     | "uploaded"
     | "recording"
     | "transcribing"
@@ -24,8 +25,28 @@ export interface Meeting {
   recording_type: "upload" | "live" | null;
 }
 
+export type MeetingListItem = Omit<Meeting, "transcript" | "summary"> & {
+  summary_overview: string | null;
+};
+
 export interface UploadResponse {
   success: boolean;
   task_id: string;
   message: string;
+  queue_position?: number | null;
+}
+
+// Lightweight status; transcript and summary only arrive once completed
+export type MeetingStatus = Omit<Meeting, "transcript" | "summary"> &
+  Partial<Pick<Meeting, "transcript" | "summary">> & {
+    progress?: number | null;
+    queue_position?: number | null;
+  };
+
+export interface ProgressEvent {
+  type: "progress";
+  task_id: string;
+  status: Meeting["status"];
+  progress: number | null;
+  queue_position?: number | null;
 }
@@ -33,6 +33,7 @@ export function getStatusColor(status: string): string {
       return "text-primary bg-accent";
     case "recording":
       return "text-destructive bg-destructive/10";
+    case "importing":
     case "uploaded":
       return "text-muted-foreground bg-muted";
     case "error":
@@ -3,13 +3,23 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
+import threading
 
-from app.database import engine, Base
+from app.database import engine, Base, add_missing_columns
+from app.services.search import setup_search_index
 from app.api import routes, websockets
+from app.api.limits import UploadLimitMiddleware
+from app.services.jobs import scheduler
+from app.services.storage import storage
+from app.services.whisper_engine import start_engines, shutdown_engines
+from app.services import llm
+from app.config import WHISPER_PRELOAD
 
 # Create database tables
 print("Creating database tables...")
 Base.metadata.create_all(bind=engine)
+add_missing_columns()
+setup_search_index(engine)
 print("✅ Database tables created")
 
 # Create necessary directories
@@ -24,13 +34,17 @@ app = FastAPI(
     version="2.0.0"
 )
 
-# CORS middleware
+# Reject oversized uploads and uploads to a full queue before reading the body
+app.add_middleware(UploadLimitMiddleware)
+
+# CORS middleware (added last so it wraps the early rejections too)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -43,6 +57,11 @@ if os.path.exists("app/static"):
 
 @app.on_event("startup")
 async def startup_event():
+    scheduler.start()
+    storage.start()
+    if WHISPER_PRELOAD:
+        # Preload Whisper worker processes without holding up startup
+        threading.Thread(target=start_engines, daemon=True).start()
     print("\n" + "="*60)
     print("🚀 MeetScribe FastAPI - LOCAL AI VERSION")
     print("="*60)
@@ -55,6 +74,13 @@ async def startup_event():
     print("\n Upload or record audio to get AI summaries!")
     print("="*60 + "\n")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    scheduler.stop()
+    storage.stop()
+    shutdown_engines()
+    llm.shutdown()
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
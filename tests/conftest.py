@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+
+# The app reads its settings at import time: point it at a scratch directory first
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="meetscribe-test-")
+os.environ.update({
+    "SQLALCHEMY_DATABASE_URL": f"sqlite:///{os.path.join(WORKDIR, 'test.db')}",
+    "CACHE_DIR": os.path.join(WORKDIR, "cache"),
+    "WHISPER_PRELOAD": "false",
+    "LIVE_PASS_INTERVAL_SECONDS": "0.2",
+    "LIVE_OVERLAP_SECONDS": "1",
+    "AUDIO_RETENTION_DAYS": "0",
+    "AUDIO_QUOTA_BYTES": "0"
+})
+os.chdir(WORKDIR)
+sys.path.insert(0, REPO_ROOT)
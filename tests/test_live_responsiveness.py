@@ -0,0 +1,130 @@
+"""The event loop stays responsive while several live recordings are processed"""
+import asyncio
+import json
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+import httpx
+import uvicorn
+import websockets
+
+import main
+from app.services import llm, streaming
+from app.services.llm import LLMBackend
+
+SESSIONS = 3
+CHUNKS_PER_SESSION = 20
+# One second of 16 kHz 16-bit mono per chunk; the stub engine only looks at file sizes
+CHUNK = b"\0" * 32000
+# Worker time per transcription pass, spent off the event loop
+PASS_SECONDS = 0.3
+MAX_LOOP_LAG = 0.25
+
+SUMMARY = {
+    "overview": "The team agreed on the launch plan.",
+    "key_points": ["Launch plan"],
+    "action_items": [],
+    "decisions": ["Launch next week"]
+}
+
+class StubEngine:
+    """Resolves transcription windows from a timer thread, like a Whisper worker process would"""
+
+    def submit_window(self, filepath: str, start: float, **options) -> Future:
+        future = Future()
+
+        def resolve():
+            with open(filepath, "rb") as f:
+                end = len(f.read()) / len(CHUNK)
+            segments = []
+            position = start
+            while position < end:
+                segments.append({"start": position, "end": min(end, position + 2), "text": f" words at {position:.0f}"})
+                position += 2
+            future.set_result({"end": end, "segments": segments})
+
+        threading.Timer(PASS_SECONDS, resolve).start()
+        return future
+
+class StubLLM(LLMBackend):
+    name = "stub"
+
+    async def generate(self, prompt, on_token=None):
+        await asyncio.sleep(0.2)
+        return json.dumps(SUMMARY)
+
+class LoopLagProbe:
+    """Measures how late a periodic timer fires on the server's event loop"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.worst = 0.0
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.worst = max(self.worst, time.perf_counter() - started - self.interval)
+
+    async def start(self):
+        self.task = asyncio.create_task(self.run())
+
+def _frame(session_id: str, seq: int) -> bytes:
+    header = json.dumps({"session_id": session_id, "seq": seq}).encode()
+    return struct.pack(">H", len(header)) + header + CHUNK
+
+async def _record(url: str, stopped: asyncio.Queue) -> str:
+    """Stream one live session, stop it and wait for its result; returns the session id"""
+    async with websockets.connect(url) as ws:
+        await ws.send(json.dumps({"type": "start_recording", "streaming": True}))
+        session_id = json.loads(await ws.recv())["session_id"]
+        for seq in range(CHUNKS_PER_SESSION):
+            await ws.send(_frame(session_id, seq))
+            await asyncio.sleep(0.02)
+        await ws.send(json.dumps({"type": "stop_recording", "session_id": session_id}))
+        await stopped.put(session_id)
+        while True:
+            message = json.loads(await asyncio.wait_for(ws.recv(), 30))
+            if message["type"] in ("processing_complete", "error"):
+                assert message["type"] == "processing_complete", message
+                assert message["transcript"]
+                return session_id
+
+def test_loop_stays_responsive_during_concurrent_live_sessions(monkeypatch):
+    monkeypatch.setattr(streaming, "get_engine", lambda model_size=None: StubEngine())
+    llm.set_backend(StubLLM())
+    probe = LoopLagProbe()
+    monkeypatch.setattr(main.app.router, "on_startup", main.app.router.on_startup + [probe.start])
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    async def scenario():
+        stopped = asyncio.Queue()
+        sessions = [asyncio.create_task(_record(f"ws://127.0.0.1:{port}/ws", stopped)) for _ in range(SESSIONS)]
+        # Ask for a session's status while the sessions are being processed
+        session_id = await stopped.get()
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", trust_env=False) as client:
+            started = time.perf_counter()
+            response = await client.get(f"/status/{session_id}")
+            status_seconds = time.perf_counter() - started
+        assert response.status_code == 200
+        assert response.json()["status"] in ("processing", "transcribing", "summarizing")
+        assert status_seconds < MAX_LOOP_LAG, f"/status took {status_seconds:.3f}s"
+        return await asyncio.gather(*sessions)
+
+    try:
+        finished = asyncio.run(asyncio.wait_for(scenario(), 60))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        llm.set_backend(None)
+
+    assert len(set(finished)) == SESSIONS
+    assert probe.worst < MAX_LOOP_LAG, f"event loop lagged {probe.worst:.3f}s"
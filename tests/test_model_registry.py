@@ -0,0 +1,57 @@
+"""Whisper pools started through the registry stay within its memory budget"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services import whisper_engine
+from app.services.whisper_engine import MODEL_MEMORY_MB, ModelRegistry
+
+MODELS = ("small", "base", "tiny")
+JOBS_PER_THREAD = 100
+
+class ThreadPool(ThreadPoolExecutor):
+    """Stands in for the worker processes; takes ProcessPoolExecutor's arguments"""
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        super().__init__(max_workers=max_workers)
+
+def _job():
+    time.sleep(random.random() * 0.005)
+
+def test_pool_evicted_before_submit_restarts_within_budget(monkeypatch):
+    monkeypatch.setattr(whisper_engine, "ProcessPoolExecutor", ThreadPool)
+    registry = ModelRegistry({}, 1, budget_mb=MODEL_MEMORY_MB["small"])
+    # Jobs never overlap, so one running pool at a time always fits
+    one_job = threading.Lock()
+    over_budget = []
+    done = threading.Event()
+
+    def watch():
+        while not done.is_set():
+            used = sum(e.memory_mb for e in registry.engines() if e.running)
+            if used > registry.budget_mb:
+                over_budget.append(used)
+            time.sleep(0.0005)
+
+    def use(model_size):
+        for _ in range(JOBS_PER_THREAD):
+            engine = registry.get(model_size)
+            # Another thread may unload this pool before the job is submitted
+            time.sleep(random.random() * 0.002)
+            with one_job:
+                engine._submit(_job).result()
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    users = [threading.Thread(target=use, args=(model,)) for model in MODELS for _ in range(2)]
+    for thread in users:
+        thread.start()
+    for thread in users:
+        thread.join()
+    done.set()
+    watcher.join()
+    for engine in registry.engines():
+        engine.shutdown()
+
+    assert not over_budget